@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.utils.decorators import method_decorator
 from .models import CustomUser
+from .uploads import AVATAR_FIELD, StreamedPhoto, attach_streamed_photo, stream_avatar_uploads
 
 
 class CustomUserAdmin(UserAdmin):
@@ -11,5 +13,36 @@ class CustomUserAdmin(UserAdmin):
         ('Additional Information', {'fields': ('date_of_birth', 'profile_photo')}),
     )
 
+    # Profile photos are streamed to storage as they arrive (see uploads.py)
+    @method_decorator(stream_avatar_uploads)
+    def add_view(self, request, form_url='', extra_context=None):
+        return super().add_view(request, form_url, extra_context)
+
+    @method_decorator(stream_avatar_uploads)
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        return super().change_view(request, object_id, form_url, extra_context)
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        error = getattr(request, 'avatar_upload_error', None)
+        if error is None:
+            return form
+
+        # The rejected photo never reaches the form: report it on its field
+        class RejectedPhotoForm(form):
+            def clean(self):
+                self.add_error(AVATAR_FIELD, error)
+                return super().clean()
+
+        return RejectedPhotoForm
+
+    def save_model(self, request, obj, form, change):
+        photo = form.cleaned_data.get(AVATAR_FIELD)
+        if isinstance(photo, StreamedPhoto):
+            # Already in storage: point the field at it instead of copying it
+            attach_streamed_photo(obj, photo)
+        else:
+            super().save_model(request, obj, form, change)
+
 
 admin.site.register(CustomUser, CustomUserAdmin)
@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models import DEFERRED
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 
+from .thumbnails import discard_thumbnails, schedule_thumbnails
+
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, username, email, password=None, **extra_fields):
@@ -31,8 +34,47 @@ class CustomUserManager(BaseUserManager):
 class CustomUser(AbstractUser):
     date_of_birth = models.DateField(null=True, blank=True)
     profile_photo = models.ImageField(upload_to='profile_photos/', null=True, blank=True)
+    # {"<size>": "<storage path>"} for the current photo, filled in the background
+    profile_photo_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
 
     objects = CustomUserManager()
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # The stored photo name, to spot a new upload on save
+        user._loaded_photo = user.__dict__.get('profile_photo', DEFERRED)
+        return user
+
+    def _photo_changed(self):
+        loaded = getattr(self, '_loaded_photo', None)
+        if loaded is DEFERRED and 'profile_photo' not in self.__dict__:
+            return False
+        return (self.profile_photo.name or None) != (loaded or None)
+
+    def save(self, *args, **kwargs):
+        photo_changed = self._photo_changed()
+        if photo_changed:
+            # Old thumbnails belong to the old photo
+            discard_thumbnails(self.profile_photo.storage, self.profile_photo_thumbnails.values())
+            self.profile_photo_thumbnails = {}
+        super().save(*args, **kwargs)
+        self._loaded_photo = self.profile_photo.name
+        if photo_changed and self.profile_photo:
+            schedule_thumbnails(self.pk)
+
+    def profile_photo_url(self, size=64):
+        """
+        URL of the smallest thumbnail at least ``size`` pixels wide, else the
+        largest one; the original photo until thumbnails exist.
+        """
+        if not self.profile_photo:
+            return None
+        thumbnails = sorted((int(width), name) for width, name in self.profile_photo_thumbnails.items())
+        if not thumbnails:
+            return self.profile_photo.url
+        name = next((name for width, name in thumbnails if width >= size), thumbnails[-1][1])
+        return self.profile_photo.storage.url(name)
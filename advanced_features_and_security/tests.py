@@ -0,0 +1,204 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.files.storage import InMemoryStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import path, reverse
+from PIL import Image
+
+from . import models
+from .models import CustomUser
+from .thumbnails import THUMBNAIL_SIZES, generate_thumbnails, shrink_for_thumbnails
+from .uploads import AVATAR_MAX_SIZE, StreamingAvatarUploadHandler
+
+
+def image_file(name='photo.jpg', size=(600, 300), image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+class MediaRootTestCase(TestCase):
+    """Stores uploads in a throwaway MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+
+# Thumbnails are rendered by calling generate_thumbnails() directly, not by the worker pool
+@mock.patch.object(models, 'schedule_thumbnails')
+class ThumbnailTests(MediaRootTestCase):
+
+    def create_user(self, photo):
+        user = CustomUser.objects.create_user('photographer', 'p@example.com', 'pass12345')
+        user.profile_photo = photo
+        user.save()
+        return user
+
+    def test_generates_every_size(self, schedule):
+        user = self.create_user(image_file())
+        schedule.assert_called_once_with(user.pk)
+        generate_thumbnails(user.pk)
+
+        user.refresh_from_db()
+        self.assertEqual(sorted(map(int, user.profile_photo_thumbnails)), list(THUMBNAIL_SIZES))
+        storage = user.profile_photo.storage
+        for size, name in user.profile_photo_thumbnails.items():
+            with storage.open(name) as stored, Image.open(stored) as thumbnail:
+                self.assertEqual(thumbnail.size, (int(size), int(size)))
+
+    def test_profile_photo_url_picks_the_smallest_covering_thumbnail(self, schedule):
+        user = self.create_user(image_file())
+        self.assertEqual(user.profile_photo_url(64), user.profile_photo.url)
+
+        generate_thumbnails(user.pk)
+        user.refresh_from_db()
+        storage = user.profile_photo.storage
+        thumbnails = user.profile_photo_thumbnails
+        self.assertEqual(user.profile_photo_url(48), storage.url(thumbnails['64']))
+        self.assertEqual(user.profile_photo_url(100), storage.url(thumbnails['128']))
+        self.assertEqual(user.profile_photo_url(1000), storage.url(thumbnails['256']))
+
+    def test_replacing_the_photo_deletes_its_thumbnails(self, schedule):
+        user = self.create_user(image_file())
+        generate_thumbnails(user.pk)
+        user.refresh_from_db()
+        old = list(user.profile_photo_thumbnails.values())
+        storage = user.profile_photo.storage
+
+        user.profile_photo = image_file('other.png', image_format='PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(user.profile_photo_thumbnails, {})
+        self.assertFalse(any(storage.exists(name) for name in old))
+
+    def test_thumbnails_for_a_replaced_photo_are_not_kept(self, schedule):
+        user = self.create_user(image_file())
+        storage = user.profile_photo.storage
+        rendered = []
+        save = storage.save
+
+        def save_then_replace(name, content):
+            rendered.append(save(name, content))
+            CustomUser.objects.filter(pk=user.pk).update(profile_photo='profile_photos/newer.jpg')
+            return rendered[-1]
+
+        with mock.patch.object(storage, 'save', side_effect=save_then_replace):
+            generate_thumbnails(user.pk)
+        self.assertEqual(len(rendered), len(THUMBNAIL_SIZES))
+        self.assertFalse(any(storage.exists(name) for name in rendered))
+
+
+class ShrinkTests(TestCase):
+
+    def test_large_photos_are_reduced_before_decoding(self):
+        buffer = BytesIO()
+        Image.new('RGB', (4000, 3000), 'teal').save(buffer, 'JPEG')
+        with Image.open(buffer) as image:
+            shrunk = shrink_for_thumbnails(image)
+            self.assertEqual(min(shrunk.size), max(THUMBNAIL_SIZES))
+            self.assertAlmostEqual(shrunk.size[0] / shrunk.size[1], 4 / 3, places=2)
+
+    def test_small_photos_are_left_alone(self):
+        image = Image.new('RGB', (200, 100))
+        self.assertEqual(shrink_for_thumbnails(image).size, (200, 100))
+
+
+urlpatterns = [path('admin/', admin.site.urls)]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+@mock.patch.object(models, 'schedule_thumbnails')
+class StreamedUploadTests(MediaRootTestCase):
+    """Profile photos uploaded through the admin's change and add views."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = CustomUser.objects.create_superuser('admin', 'a@example.com', 'pass12345')
+        self.user = CustomUser.objects.create_user('uploader', 'u@example.com', 'pass12345')
+        self.client.force_login(self.admin)
+
+    def stored_files(self):
+        directory = os.path.join(settings.MEDIA_ROOT, 'profile_photos')
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def upload(self, photo, **data):
+        joined = self.user.date_joined
+        form = {
+            'username': self.user.username, 'email': self.user.email, 'is_active': 'on',
+            'date_joined_0': joined.strftime('%Y-%m-%d'), 'date_joined_1': joined.strftime('%H:%M:%S'),
+            'profile_photo': photo, **data,
+        }
+        return self.client.post(reverse('admin:accounts_customuser_change', args=[self.user.pk]), form)
+
+    def form_errors(self, response):
+        self.assertEqual(response.status_code, 200)
+        return response.context['adminform'].form.errors
+
+    def test_valid_upload_is_attached_without_a_copy(self, schedule):
+        response = self.upload(image_file())
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.profile_photo.name.endswith('.jpg'))
+        self.assertEqual(self.stored_files(), [os.path.basename(self.user.profile_photo.name)])
+        schedule.assert_called_once_with(self.user.pk)
+
+    def test_add_view_attaches_the_upload(self, schedule):
+        response = self.client.post(reverse('admin:accounts_customuser_add'), {
+            'username': 'newcomer', 'password1': 'Str0ng-pass-phrase', 'password2': 'Str0ng-pass-phrase',
+            'usable_password': 'true', 'profile_photo': image_file('new.png', image_format='PNG'),
+        })
+        self.assertEqual(response.status_code, 302)
+        user = CustomUser.objects.get(username='newcomer')
+        self.assertEqual(self.stored_files(), [os.path.basename(user.profile_photo.name)])
+
+    def test_oversized_upload_is_rejected_and_removed(self, schedule):
+        photo = image_file()
+        photo = SimpleUploadedFile('big.jpg', photo.read() + b'\0' * AVATAR_MAX_SIZE, 'image/jpeg')
+        errors = self.form_errors(self.upload(photo))
+        self.assertIn('at most', errors['profile_photo'][0])
+        self.assertEqual(self.stored_files(), [])
+
+    def test_wrong_type_is_rejected_without_storing(self, schedule):
+        photo = SimpleUploadedFile('photo.jpg', b'%PDF-1.7 not an image', 'image/jpeg')
+        errors = self.form_errors(self.upload(photo))
+        self.assertIn('JPEG, PNG, GIF or WebP', errors['profile_photo'][0])
+        self.assertEqual(self.stored_files(), [])
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.profile_photo)
+
+    def test_upload_with_an_invalid_form_is_removed(self, schedule):
+        errors = self.form_errors(self.upload(image_file(), username=''))
+        self.assertIn('username', errors)
+        self.assertEqual(self.stored_files(), [])
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.profile_photo)
+
+    def test_csrf_is_still_enforced(self, schedule):
+        self.client = self.client_class(enforce_csrf_checks=True)
+        self.client.force_login(self.admin)
+        response = self.upload(image_file())
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.stored_files(), [])
+
+    def test_only_local_storage_exposes_a_file_path(self, schedule):
+        data = image_file().read()
+        for storage, local in ((CustomUser._meta.get_field('profile_photo').storage, True),
+                               (InMemoryStorage(), False)):
+            handler = StreamingAvatarUploadHandler()
+            with mock.patch.object(handler.field, 'storage', storage):
+                handler.new_file('profile_photo', 'photo.jpg', 'image/jpeg', len(data))
+                handler.receive_data_chunk(data, 0)
+                photo = handler.file_complete(len(data))
+            self.assertEqual(hasattr(photo, 'temporary_file_path'), local)
+            self.assertEqual(photo.read(), data)
+            photo.discard()
@@ -0,0 +1,120 @@
+"""
+Thumbnails for CustomUser.profile_photo.
+
+Uploads are kept as they are; when a new photo is saved, square thumbnails
+are rendered off the request thread by a small worker pool and their
+storage paths recorded in ``CustomUser.profile_photo_thumbnails``. Pages
+showing avatars use ``CustomUser.profile_photo_url(size)``, which picks the
+smallest thumbnail that covers the requested size.
+"""
+
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Edge lengths in pixels of the square thumbnails
+THUMBNAIL_SIZES = (64, 128, 256)
+
+# WebP is about a third smaller than JPEG at the same quality; JPEG is the
+# fallback when Pillow was built without WebP support.
+THUMBNAIL_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+THUMBNAIL_QUALITY = 80
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ACCOUNTS_THUMBNAIL_WORKERS', 2),
+    thread_name_prefix='thumbnails',
+)
+
+
+def schedule_thumbnails(user_id):
+    """Render a user's thumbnails in the background once the upload is committed."""
+    transaction.on_commit(lambda: _executor.submit(_generate_in_worker, user_id))
+
+
+def _generate_in_worker(user_id):
+    try:
+        generate_thumbnails(user_id)
+    except Exception:
+        logger.exception('Thumbnail generation failed for user %s', user_id)
+    finally:
+        # Worker threads keep their own connections; don't leak them
+        close_old_connections()
+
+
+def shrink_for_thumbnails(image, edge=max(THUMBNAIL_SIZES)):
+    """
+    Scale an unloaded image down in place until its shorter side is about
+    ``edge`` pixels. Only the reduced image is ever held in memory: JPEGs are
+    decoded straight at 1/2, 1/4 or 1/8 scale (``draft()``), and other
+    formats are resized as soon as they are loaded.
+    """
+    scale = edge / min(image.size)
+    if scale < 1:
+        size = (max(edge, math.ceil(image.width * scale)), max(edge, math.ceil(image.height * scale)))
+        image.draft('RGB', size)
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+    return image
+
+
+def render_thumbnail(image, size):
+    """Encode a ``size`` x ``size`` center-cropped thumbnail of an open image."""
+    thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    if THUMBNAIL_FORMAT == 'WEBP':
+        thumbnail.save(buffer, 'WEBP', quality=THUMBNAIL_QUALITY, method=6)
+    else:
+        thumbnail.save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def thumbnail_name(source_name, size):
+    source = PurePosixPath(source_name)
+    extension = 'webp' if THUMBNAIL_FORMAT == 'WEBP' else 'jpg'
+    return str(source.parent / 'thumbnails' / f'{source.stem}_{size}.{extension}')
+
+
+def generate_thumbnails(user_id):
+    """Render and store every thumbnail size for a user's current photo."""
+    User = get_user_model()
+    user = User.objects.filter(pk=user_id).only('profile_photo', 'profile_photo_thumbnails').first()
+    if user is None or not user.profile_photo:
+        return
+
+    photo = user.profile_photo
+    storage = photo.storage
+    with photo.open('rb'), Image.open(photo) as image:
+        # Shrink before anything decodes the full-size photo, then honour camera
+        # rotation and drop alpha/palette modes JPEG can't store
+        image = ImageOps.exif_transpose(shrink_for_thumbnails(image)).convert('RGB')
+        thumbnails = {}
+        for size in THUMBNAIL_SIZES:
+            name = thumbnail_name(photo.name, size)
+            if storage.exists(name):
+                storage.delete(name)
+            thumbnails[str(size)] = storage.save(name, ContentFile(render_thumbnail(image, size)))
+
+    # Only record them if the photo wasn't replaced while we were working
+    if not User.objects.filter(pk=user_id, profile_photo=photo.name).update(profile_photo_thumbnails=thumbnails):
+        delete_thumbnails(storage, thumbnails.values())
+
+
+def delete_thumbnails(storage, names):
+    for name in names:
+        storage.delete(name)
+
+
+def discard_thumbnails(storage, names):
+    """Delete a replaced photo's thumbnails once the replacement is committed."""
+    names = list(names)
+    if names:
+        transaction.on_commit(lambda: delete_thumbnails(storage, names))
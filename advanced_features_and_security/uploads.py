@@ -0,0 +1,204 @@
+"""
+Streaming upload handling for CustomUser.profile_photo.
+
+Django's default handlers buffer each upload in memory (up to
+FILE_UPLOAD_MAX_MEMORY_SIZE) and then in a temporary file, and only then
+does the form check it; the model later copies it into storage. For avatars,
+``StreamingAvatarUploadHandler`` instead:
+
+* checks the type from the file's first bytes (not the client's
+  Content-Type), skipping anything that isn't a JPEG, PNG, GIF or WebP;
+* counts bytes as they arrive and stops reading the request as soon as a
+  file goes over ``ACCOUNTS_AVATAR_MAX_SIZE``;
+* writes each fixed-size chunk straight to the photo field's storage, so a
+  request holds at most one chunk in memory however many are in flight.
+
+Wrap the view with ``stream_avatar_uploads`` and attach the result with
+``attach_streamed_photo()``, which points the field at the stored file
+rather than copying it again; uploads the view doesn't attach (say, the
+rest of the form was invalid) are deleted once it returns. Rejections are
+left on ``request.avatar_upload_error`` for the view to report. The admin's
+CustomUser add and change views are wired up this way (``admin.py``).
+"""
+
+import os
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+AVATAR_FIELD = 'profile_photo'
+AVATAR_MAX_SIZE = getattr(settings, 'ACCOUNTS_AVATAR_MAX_SIZE', 5 * 1024 * 1024)
+AVATAR_CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of each accepted format -> (content type, extension)
+SIGNATURES = {
+    b'\xff\xd8\xff': ('image/jpeg', 'jpg'),
+    b'\x89PNG\r\n\x1a\n': ('image/png', 'png'),
+    b'GIF87a': ('image/gif', 'gif'),
+    b'GIF89a': ('image/gif', 'gif'),
+}
+
+
+def sniff_image_type(header):
+    """``(content_type, extension)`` for the first bytes of a file, or None."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp', 'webp'
+    for signature, kind in SIGNATURES.items():
+        if header.startswith(signature):
+            return kind
+    return None
+
+
+class StreamedPhoto(UploadedFile):
+    """An avatar already written to the photo field's storage as ``storage_name``."""
+
+    def __init__(self, storage, storage_name, content_type, size):
+        # UploadedFile keeps only the base name; the storage path is kept apart
+        super().__init__(None, storage_name, content_type, size)
+        self.storage = storage
+        self.storage_name = storage_name
+        self.attached = False
+
+    @property
+    def file(self):
+        # Opened on first read (e.g. by ImageField validation)
+        if self._file is None:
+            self._file = self.storage.open(self.storage_name, 'rb')
+        return self._file
+
+    @file.setter
+    def file(self, value):
+        self._file = value
+
+    def discard(self):
+        """Delete the stored file, e.g. when the form it came with is invalid."""
+        if self._file is not None:
+            self._file.close()
+        self.storage.delete(self.storage_name)
+
+
+class LocalStreamedPhoto(StreamedPhoto):
+    """A ``StreamedPhoto`` in a ``FileSystemStorage``, so it has a local path."""
+
+    def temporary_file_path(self):
+        # Lets Pillow read the file from disk instead of loading it into memory
+        return self.storage.path(self.storage_name)
+
+
+class StreamingAvatarUploadHandler(FileUploadHandler):
+    chunk_size = AVATAR_CHUNK_SIZE
+
+    def __init__(self, request=None, field_name=AVATAR_FIELD, max_size=AVATAR_MAX_SIZE):
+        super().__init__(request)
+        self.stream_field = field_name
+        self.max_size = max_size
+        self.field = get_user_model()._meta.get_field(AVATAR_FIELD)
+        self.active = False
+        self.stored_name = None
+
+    def reject(self, message):
+        if self.request is not None:
+            self.request.avatar_upload_error = message
+        self.remove_partial_file()
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name == self.stream_field
+        self.stored_name = None
+        if self.active and self.content_length and self.content_length > self.max_size:
+            # The part declared its size up front: don't read any of it
+            self.reject(f'Profile photos may be at most {filesizeformat(self.max_size)}.')
+            raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        if start == 0:
+            kind = sniff_image_type(raw_data[:12])
+            if kind is None:
+                self.reject('Profile photos must be JPEG, PNG, GIF or WebP images.')
+                raise SkipFile
+            self.content_type, extension = kind
+            self.open_stored_file(extension)
+
+        if start + len(raw_data) > self.max_size:
+            self.reject(f'Profile photos may be at most {filesizeformat(self.max_size)}.')
+            # Stop reading the request body altogether
+            raise StopUpload(connection_reset=True)
+
+        self.file.write(raw_data)
+        return None
+
+    def open_stored_file(self, extension):
+        storage = self.field.storage
+        # Random names: never trust the client's file name, and concurrent
+        # uploads can't collide between choosing a name and writing it
+        name = self.field.generate_filename(None, f'{uuid.uuid4().hex}.{extension}')
+        try:
+            os.makedirs(os.path.dirname(storage.path(name)), exist_ok=True)
+        except NotImplementedError:
+            pass  # Remote storage: no directories to create
+        self.stored_name = name
+        self.file = storage.open(name, 'wb')
+
+    def file_complete(self, file_size):
+        if not self.active or self.stored_name is None:
+            return None
+        self.file.close()
+        self.active = False
+        storage = self.field.storage
+        # Only local files have a path; anything else must be read through the storage
+        photo_class = LocalStreamedPhoto if isinstance(storage, FileSystemStorage) else StreamedPhoto
+        return photo_class(storage, self.stored_name, self.content_type, file_size)
+
+    def remove_partial_file(self):
+        if self.stored_name is not None:
+            self.file.close()
+            self.field.storage.delete(self.stored_name)
+            self.stored_name = None
+
+    def upload_interrupted(self):
+        self.remove_partial_file()
+
+
+def stream_avatar_uploads(view):
+    """
+    Run a view with ``StreamingAvatarUploadHandler`` in front of the default
+    handlers. CSRF is checked after the handler is installed, since reading
+    the token parses the upload. Streamed files the view didn't attach are
+    deleted afterwards.
+    """
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, StreamingAvatarUploadHandler(request))
+        try:
+            return csrf_protect(view)(request, *args, **kwargs)
+        finally:
+            discard_unattached_photos(request)
+    return wrapper
+
+
+def discard_unattached_photos(request):
+    # Only look at uploads that were parsed; don't read the body here
+    files = getattr(request, '_files', None)
+    if files is None:
+        return
+    for photo in files.getlist(AVATAR_FIELD):
+        if isinstance(photo, StreamedPhoto) and not photo.attached:
+            photo.discard()
+
+
+def attach_streamed_photo(user, photo):
+    """Point ``user.profile_photo`` at a streamed upload and save it (no copy)."""
+    user.profile_photo = photo.storage_name
+    user.save()
+    photo.attached = True
@@ -1,8 +1,45 @@
-from django.db import models
+# api/models.py
+
+from django.db import models, router, transaction
+from django.utils import timezone
 
 class Book(models.Model):
     title = models.CharField(max_length=100)
     author = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            # The list endpoint pages by id within an exact author/title
+            # match (or a title prefix), so each filter leads an (x, id) index
+            models.Index(fields=['author', 'id'], name='api_book_author_id_idx'),
+            models.Index(fields=['title', 'id'], name='api_book_title_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} by {self.author}"
+
+
+class BookChange(models.Model):
+    """
+    Change log behind the sync API (see api/changes.py): one row per book
+    that has ever existed, deleted and re-inserted on every change so the
+    auto-increment id orders the changes. Deleted books keep a tombstone row.
+    """
+    # Not a foreign key: tombstones outlive their books
+    book_id = models.BigIntegerField(unique=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def record(cls, book_ids, deleted=False):
+        """Log a change (or the deletion) of each of ``book_ids``."""
+        book_ids = list(book_ids)
+        if not book_ids:
+            return
+        db = router.db_for_write(cls)
+        changed_at = timezone.now()
+        with transaction.atomic(using=db):
+            cls.objects.using(db).filter(book_id__in=book_ids).delete()
+            cls.objects.using(db).bulk_create(
+                [cls(book_id=book_id, deleted=deleted, changed_at=changed_at) for book_id in book_ids]
+            )
@@ -0,0 +1,46 @@
+# api/caching.py
+
+"""
+Server-side caching and ETags for the Book API.
+
+Every cached response is stored under the current *version* of the books
+table, which any write bumps (``signals.py``; bulk writes call
+``bump_books_version()`` themselves). The ETag is derived from that version
+and the request URL alone, so a matching ``If-None-Match`` is answered with
+``304`` before the database is touched.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+BOOKS_VERSION_KEY = 'api:books:version'
+RESPONSE_TIMEOUT = 300
+
+
+def get_books_version():
+    version = cache.get(BOOKS_VERSION_KEY)
+    if version is None:
+        # A timestamp, so an evicted version never repeats an older one
+        version = time.time_ns()
+        cache.add(BOOKS_VERSION_KEY, version, None)
+        version = cache.get(BOOKS_VERSION_KEY, version)
+    return version
+
+
+def bump_books_version():
+    """Invalidate every cached response once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(BOOKS_VERSION_KEY, time.time_ns(), None))
+
+
+def response_etag(request):
+    # The Accept header picks the renderer, so it is part of the representation
+    parts = [str(get_books_version()), request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def response_key(etag):
+    return f'api:books:response:{etag.strip(chr(34))}'
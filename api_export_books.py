@@ -0,0 +1,34 @@
+# api/management/commands/export_books.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_books, write_blocks
+from api.models import Book
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream every book as NDJSON or CSV, optionally gzipped, to a file or "
+        "stdout, in constant memory. The row rate is reported on stderr."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', dest='export_format')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip.')
+        parser.add_argument('--output', '-o', help='File to write to (default: stdout).')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help='Rows fetched and encoded at a time.')
+
+    def handle(self, *args, **options):
+        rows = Book.objects.count()
+        started = time.perf_counter()
+        written = write_blocks(
+            export_books(options['export_format'], options['chunk_size'], options['gzip']), options['output'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {rows} books ({written / 1e6:.1f} MB) in {elapsed:.2f} s: '
+            f'{rows / elapsed if elapsed else 0:,.0f} rows/s.'
+        ))
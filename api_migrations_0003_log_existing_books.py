@@ -0,0 +1,32 @@
+# api/migrations/0003_log_existing_books.py
+
+from itertools import islice
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def log_existing_books(apps, schema_editor):
+    # Every existing book starts in the log, so a sync from since=0 sees them all
+    Book = apps.get_model('api', 'Book')
+    BookChange = apps.get_model('api', 'BookChange')
+    db_alias = schema_editor.connection.alias
+    now = timezone.now()
+    book_ids = Book.objects.using(db_alias).order_by('pk').values_list('pk', flat=True).iterator(chunk_size=10000)
+    while batch := list(islice(book_ids, 10000)):
+        BookChange.objects.using(db_alias).bulk_create(
+            [BookChange(book_id=book_id, changed_at=now) for book_id in batch],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        # The migration makemigrations generates for BookChange
+        ('api', '0002_bookchange'),
+    ]
+
+    operations = [
+        migrations.RunPython(log_existing_books, migrations.RunPython.noop),
+    ]
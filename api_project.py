@@ -1,5 +1,14 @@
 INSTALLED_APPS = [
     ...,
     'rest_framework',
-    'api',
+    'api.apps.ApiConfig',
 ]
+
+# Cached Book API responses (api/caching.py); use a shared backend such as
+# Redis or Memcached when running more than one process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api',
+    }
+}
@@ -0,0 +1,30 @@
+# api/serializers.py
+
+from rest_framework import serializers
+
+from .models import Book
+
+
+class BookSerializer(serializers.ModelSerializer):
+    """Serialises books, optionally limited to a subset of ``fields``."""
+
+    class Meta:
+        model = Book
+        fields = ['id', 'title', 'author']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class BookIngestSerializer(serializers.Serializer):
+    """
+    Validates one row of a bulk upload. Rows with an ``id`` are upserted on
+    it; rows without one are created.
+    """
+
+    id = serializers.IntegerField(required=False, min_value=1)
+    title = serializers.CharField(max_length=100)
+    author = serializers.CharField(max_length=100)
@@ -0,0 +1,23 @@
+# api/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_books_version
+from .models import Book, BookChange
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, **kwargs):
+    bump_books_version()
+
+
+@receiver(post_save, sender=Book)
+def log_saved_book(sender, instance, **kwargs):
+    BookChange.record([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def log_deleted_book(sender, instance, **kwargs):
+    BookChange.record([instance.pk], deleted=True)
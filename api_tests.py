@@ -0,0 +1,334 @@
+# api/tests.py
+
+import csv
+import gzip
+import json
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from . import views
+from .caching import get_books_version
+from .export import export_books
+from .models import Book, BookChange
+
+
+class BookAPITestCase(APITestCase):
+    """Starts every test with an empty cache so cached responses and versions don't leak."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+class BookListTests(BookAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.books = [
+            Book.objects.create(title=title, author=author)
+            for title, author in [('Dune', 'Herbert'), ('Emma', 'Austen'), ('Persuasion', 'Austen'),
+                                  ('Dracula', 'Stoker'), ('Children of Dune', 'Herbert')]
+        ]
+
+    def get(self, params=None, **extra):
+        return self.client.get(reverse('book-list'), params, **extra)
+
+    def ids(self, response):
+        return [book['id'] for book in response.json()['results']]
+
+    def test_next_and_previous_cursors(self):
+        newest_first = [book.pk for book in reversed(self.books)]
+        first = self.get({'page_size': 2})
+        self.assertEqual(self.ids(first), newest_first[:2])
+        self.assertIsNone(first.json()['previous'])
+
+        second = self.client.get(first.json()['next'])
+        self.assertEqual(self.ids(second), newest_first[2:4])
+        last = self.client.get(second.json()['next'])
+        self.assertEqual(self.ids(last), newest_first[4:])
+        self.assertIsNone(last.json()['next'])
+
+        back = self.client.get(last.json()['previous'])
+        self.assertEqual(self.ids(back), newest_first[2:4])
+
+    def test_exact_filters(self):
+        self.assertEqual(self.ids(self.get({'author': 'Austen'})), [self.books[2].pk, self.books[1].pk])
+        self.assertEqual(self.ids(self.get({'author': 'Austen', 'title': 'Emma'})), [self.books[1].pk])
+        self.assertEqual(self.ids(self.get({'title': 'emma'})), [])
+
+    def test_title_prefix_pages_in_title_order(self):
+        first = self.get({'title_prefix': 'D', 'page_size': 1, 'fields': 'author'})
+        self.assertEqual(first.json()['results'], [{'id': self.books[3].pk, 'author': 'Stoker'}])
+        second = self.client.get(first.json()['next'])
+        self.assertEqual(self.ids(second), [self.books[0].pk])
+        self.assertIsNone(second.json()['next'])
+
+    def test_fields_selects_the_returned_columns(self):
+        response = self.get({'fields': 'title', 'author': 'Stoker'})
+        self.assertEqual(response.json()['results'], [{'id': self.books[3].pk, 'title': 'Dracula'}])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.get({'fields': 'title,isbn,price'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': 'Unknown field(s): isbn, price'})
+
+    def test_matching_etag_is_answered_without_queries(self):
+        response = self.get()
+        etag = response['ETag']
+        self.assertIn('Accept', response['Vary'])
+        with self.assertNumQueries(0):
+            not_modified = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+
+    def test_repeated_request_is_served_from_the_cache(self):
+        response = self.get()
+        with self.assertNumQueries(0):
+            cached = self.get()
+        self.assertEqual(cached.json(), response.json())
+
+    def test_a_write_invalidates_cached_responses(self):
+        response = self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(title='Middlemarch', author='Eliot')
+
+        stale = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(stale.status_code, 200)
+        self.assertNotEqual(stale['ETag'], response['ETag'])
+        self.assertEqual(self.ids(stale)[0], book.pk)
+
+
+class BookBulkTests(BookAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('loader', password='pass12345')
+        cls.user.user_permissions.set(Permission.objects.filter(codename__in=['add_book', 'change_book']))
+        cls.existing = Book.objects.create(title='Old title', author='Old author')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def post_json(self, rows):
+        return self.client.post(reverse('book-bulk'), rows, format='json')
+
+    def post_ndjson(self, lines):
+        body = '\n'.join(lines).encode()
+        return self.client.post(reverse('book-bulk'), body, content_type='application/x-ndjson')
+
+    def test_json_upserts_by_id_and_creates_the_rest(self):
+        response = self.post_json([
+            {'id': self.existing.pk, 'title': 'New title', 'author': 'New author'},
+            {'title': 'Fresh', 'author': 'Someone'},
+            {'id': 999, 'title': 'Given id', 'author': 'Someone'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'created': 2, 'updated': 1, 'failed': 0, 'errors': []})
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.title, self.existing.author), ('New title', 'New author'))
+        self.assertTrue(Book.objects.filter(pk=999, title='Given id').exists())
+        self.assertTrue(Book.objects.filter(title='Fresh').exists())
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        response = self.post_json([
+            {'title': '', 'author': 'Someone'},
+            'not a book',
+            {'title': 'Kept', 'author': 'Someone'},
+        ])
+        data = response.json()
+        self.assertEqual((data['created'], data['updated'], data['failed']), (1, 0, 2))
+        self.assertEqual([error['row'] for error in data['errors']], [1, 2])
+        self.assertIn('title', data['errors'][0]['errors'])
+        self.assertIn('non_field_errors', data['errors'][1]['errors'])
+        self.assertEqual(Book.objects.filter(title='Kept').count(), 1)
+
+    def test_ndjson_reports_bad_lines_by_number(self):
+        response = self.post_ndjson([
+            '{"title": "First", "author": "A"}',
+            '{"title": "Broken", ',
+            '',
+            f'{{"id": {self.existing.pk}, "title": "Updated", "author": "A"}}',
+            '{"title": "Last"}',
+        ])
+        data = response.json()
+        self.assertEqual((data['created'], data['updated'], data['failed']), (1, 1, 2))
+        self.assertEqual([error['row'] for error in data['errors']], [2, 5])
+        self.assertTrue(data['errors'][0]['errors']['non_field_errors'][0].startswith('Invalid JSON'))
+        self.assertIn('author', data['errors'][1]['errors'])
+
+    def test_a_body_that_is_not_an_array_is_rejected(self):
+        response = self.post_json({'title': 'Single', 'author': 'A'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Book.objects.filter(title='Single').exists())
+
+    @mock.patch.object(views, 'BULK_BATCH_SIZE', 2)
+    def test_rows_are_written_and_invalidated_per_batch(self):
+        rows = [{'title': f'Book {i}', 'author': 'A'} for i in range(4)]
+        rows[3] = {'title': ''}
+        rows.append({'id': self.existing.pk, 'title': 'Batch three', 'author': 'A'})
+        with mock.patch.object(views, 'bump_books_version') as bump:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post_json(rows)
+        # One transaction, one book INSERT and one version bump per batch
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "api_book" ')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(bump.call_count, 3)
+        data = response.json()
+        self.assertEqual((data['created'], data['updated'], data['failed']), (3, 1, 1))
+        self.assertEqual(data['errors'][0]['row'], 4)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.title, 'Batch three')
+
+    def test_a_batch_logs_its_books_and_bumps_the_version_on_commit(self):
+        since = BookChange.objects.latest('pk').pk
+        version = get_books_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_json([{'title': 'Logged', 'author': 'A'}])
+            self.assertEqual(get_books_version(), version)
+        self.assertNotEqual(get_books_version(), version)
+        book = Book.objects.get(title='Logged')
+        self.assertEqual(list(BookChange.objects.filter(pk__gt=since).values_list('book_id', flat=True)),
+                         [book.pk])
+
+    def test_requires_add_and_change_permissions(self):
+        self.user.user_permissions.remove(Permission.objects.get(codename='change_book'))
+        response = self.post_json([{'title': 'Nope', 'author': 'A'}])
+        self.assertEqual(response.status_code, 403)
+
+
+class BookExportTests(BookAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='pass12345', is_staff=True)
+        cls.books = [Book.objects.create(title=f'Book {i}', author='Author') for i in range(3)]
+        # Everything CSV and JSON have to escape
+        cls.books.append(Book.objects.create(title='Quotes "and", commas', author='Line\nbreak naïve'))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.staff)
+
+    def export(self, params=None, **extra):
+        response = self.client.get(reverse('book-export'), params, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson(self):
+        response, body = self.export({'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="books.ndjson"')
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(records, [{'id': book.pk, 'title': book.title, 'author': book.author} for book in self.books])
+
+    def test_csv_from_the_accept_header(self):
+        response, body = self.export(HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(StringIO(body.decode(), newline='')))
+        self.assertEqual(rows, [['id', 'title', 'author']] + [[str(book.pk), book.title, book.author]
+                                                              for book in self.books])
+
+    def test_gzip(self):
+        response, body = self.export({'format': 'csv', 'gzip': '1'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(gzip.decompress(body).startswith(b'id,title,author\r\n'))
+
+    def test_chunks_cover_every_book(self):
+        body = b''.join(export_books('ndjson', chunk_size=3))
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], [book.pk for book in self.books])
+
+    def test_staff_only(self):
+        anonymous, reader = APIClient(), APIClient()
+        reader.force_authenticate(User.objects.create_user('reader', password='pass12345'))
+        self.assertEqual(anonymous.get(reverse('book-export')).status_code, 403)
+        self.assertEqual(reader.get(reverse('book-export')).status_code, 403)
+
+    def test_unknown_format_is_not_acceptable(self):
+        response = self.client.get(reverse('book-export'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 404)
+
+
+class BookChangesTests(BookAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.books = [Book.objects.create(title=f'Book {i}', author='Author') for i in range(5)]
+
+    def changes(self, since=0, **params):
+        response = self.client.get(reverse('book-changes'), {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_sync_from_zero_pages_through_every_book(self):
+        seen = []
+        since = 0
+        while True:
+            page = self.changes(since, limit=2)
+            seen += [change['id'] for change in page['changes']]
+            since = page['since']
+            if not page['has_more']:
+                break
+        self.assertEqual(seen, [book.pk for book in self.books])
+        # Nothing new: the token stays put
+        self.assertEqual(self.changes(since), {'changes': [], 'since': since, 'has_more': False})
+
+    def test_tokens_increase_and_carry_the_current_book(self):
+        changes = self.changes()['changes']
+        tokens = [change['token'] for change in changes]
+        self.assertEqual(tokens, sorted(tokens))
+        self.assertEqual(
+            changes[0],
+            {'token': tokens[0], 'id': self.books[0].pk, 'deleted': False,
+             'book': {'id': self.books[0].pk, 'title': 'Book 0', 'author': 'Author'}},
+        )
+
+    def test_updates_and_deletes_after_a_token(self):
+        since = self.changes()['since']
+        renamed, deleted = self.books[1], self.books[3]
+        deleted_pk = deleted.pk
+        renamed.title = 'Renamed'
+        renamed.save()
+        deleted.delete()
+        renamed.save()
+
+        changes = self.changes(since)['changes']
+        # One entry per book, in the order of its latest change
+        self.assertEqual([change['id'] for change in changes], [deleted_pk, renamed.pk])
+        self.assertEqual(changes[0]['book'], None)
+        self.assertTrue(changes[0]['deleted'])
+        self.assertEqual(changes[1]['book']['title'], 'Renamed')
+
+    def test_limit_is_clamped(self):
+        page = self.changes(limit=0)
+        self.assertEqual(len(page['changes']), 1)
+        self.assertTrue(page['has_more'])
+
+    def test_errors_are_keyed_by_the_bad_parameter(self):
+        url = reverse('book-changes')
+        response = self.client.get(url, {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'since': 'since must be an integer.'})
+        response = self.client.get(url, {'since': 3, 'limit': 'ten'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'limit': 'limit must be an integer.'})
+
+    def test_migration_logs_books_created_before_the_log(self):
+        # bulk_create sends no signals, like rows that predate the log
+        BookChange.objects.all().delete()
+        older = Book.objects.bulk_create([Book(title='Old', author='Author') for _ in range(3)])
+        migration = import_module('api.migrations.0003_log_existing_books')
+        migration.log_existing_books(apps, mock.Mock(connection=connection))
+
+        ids = [change['id'] for change in self.changes()['changes']]
+        self.assertEqual(sorted(ids), sorted([book.pk for book in self.books + older]))
@@ -0,0 +1,12 @@
+# api/urls.py
+
+from django.urls import path
+
+from .views import BookBulkView, BookChangesView, BookExportView, BookListView
+
+urlpatterns = [
+    path('books/', BookListView.as_view(), name='book-list'),
+    path('books/bulk/', BookBulkView.as_view(), name='book-bulk'),
+    path('books/export/', BookExportView.as_view(), name='book-export'),
+    path('books/changes/', BookChangesView.as_view(), name='book-changes'),
+]
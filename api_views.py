@@ -0,0 +1,271 @@
+# api/views.py
+
+import json
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from .caching import RESPONSE_TIMEOUT, bump_books_version, response_etag, response_key
+from .export import export_books
+from .changes import CHANGES_MAX_PAGE_SIZE, CHANGES_PAGE_SIZE, changes_since
+from .models import Book, BookChange
+from .serializers import BookIngestSerializer, BookSerializer
+
+# Filters that can be served from the (author, id) / (title, id) indexes
+EXACT_FILTERS = ('author', 'title')
+
+
+class BookCursorPagination(CursorPagination):
+    # Keyset pagination on the primary key: every page is an index range
+    # scan of page_size + 1 rows, however many books there are, and no
+    # COUNT(*) is ever run.
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        # A title_prefix range is read in (title, id) order, straight off the
+        # (title, id) index; ordering it by -id would need a sort of the
+        # whole range before the first page.
+        if request.query_params.get('title_prefix'):
+            return ('title', 'id')
+        return super().get_ordering(request, queryset, view)
+
+
+class BookListView(generics.ListAPIView):
+    """
+    GET /api/books/?author=...&title=...&title_prefix=...&fields=id,title
+
+    ``fields`` selects the columns returned (and loaded); ``id`` is always
+    included since the cursor is built from it. Pages are newest first,
+    except for ``title_prefix`` queries, which come in title order.
+    """
+
+    serializer_class = BookSerializer
+    pagination_class = BookCursorPagination
+
+    def get_fields(self):
+        requested = self.request.query_params.get('fields')
+        if not requested:
+            return None
+        fields = {name.strip() for name in requested.split(',') if name.strip()}
+        unknown = fields - set(BookSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        return ['id'] + sorted(fields - {'id'})
+
+    def get_queryset(self):
+        queryset = Book.objects.all()
+        fields = self.get_fields()
+        prefix = self.request.query_params.get('title_prefix')
+        if fields is not None:
+            # The title_prefix cursor is built from the title as well
+            queryset = queryset.only(*fields, 'title') if prefix else queryset.only(*fields)
+        for name in EXACT_FILTERS:
+            value = self.request.query_params.get(name)
+            if value is not None:
+                queryset = queryset.filter(**{name: value})
+        if prefix:
+            # A range rather than LIKE 'x%' so the (title, id) index bounds
+            # it on every backend (SQLite skips indexes for LIKE ... ESCAPE)
+            queryset = queryset.filter(title__gte=prefix, title__lt=prefix + '\U0010ffff')
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'] = self.get_fields()
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        etag = response_etag(request)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return self.finalize(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        key = response_key(etag)
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, RESPONSE_TIMEOUT)
+        return self.finalize(Response(data), etag)
+
+    def finalize(self, response, etag):
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+
+# Rows validated and written per transaction by the bulk endpoint
+BULK_BATCH_SIZE = 1000
+# Per-row errors reported back; later ones are only counted
+BULK_MAX_REPORTED_ERRORS = 1000
+
+
+class BulkBookPermission(permissions.DjangoModelPermissions):
+    # Upserts both add and change books
+    perms_map = {
+        **permissions.DjangoModelPermissions.perms_map,
+        'POST': ['%(app_label)s.add_%(model_name)s', '%(app_label)s.change_%(model_name)s'],
+    }
+
+
+def read_rows(request):
+    """
+    Yield ``(row_number, row, error)`` from a JSON array body or, for
+    ``application/x-ndjson``, one JSON object per line as it is read.
+    """
+    if request.content_type.startswith('application/x-ndjson'):
+        for number, line in enumerate(request.stream or [], start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line), None
+            except ValueError as exc:
+                yield number, None, {api_settings.NON_FIELD_ERRORS_KEY: [f'Invalid JSON: {exc}']}
+        return
+
+    try:
+        rows = json.load(request.stream) if request.stream else []
+    except ValueError as exc:
+        raise ParseError(f'Invalid JSON: {exc}')
+    if not isinstance(rows, list):
+        raise ParseError('Expected a JSON array of books.')
+    for number, row in enumerate(rows, start=1):
+        yield number, row, None
+
+
+class BookBulkView(APIView):
+    """
+    POST /api/books/bulk/ with a JSON array or an NDJSON stream of books.
+
+    Rows are validated and written in batches of ``BULK_BATCH_SIZE``, each
+    batch in its own transaction: rows with an id as one multi-row INSERT ...
+    ON CONFLICT (id) DO UPDATE, the rest as one plain multi-row INSERT.
+    Invalid rows are reported by row number and skipped; they never roll
+    back the valid ones.
+    """
+
+    permission_classes = [BulkBookPermission]
+    queryset = Book.objects.none()
+
+    def post(self, request):
+        totals = {'created': 0, 'updated': 0, 'failed': 0}
+        errors = []
+        rows = read_rows(request)
+        while batch := list(islice(rows, BULK_BATCH_SIZE)):
+            books = {}
+            new_books = []
+            # One serializer validates the whole batch: building one per row
+            # (and deep-copying its fields) would cost more than the writes
+            validator = BookIngestSerializer()
+            for number, row, error in batch:
+                if error is None:
+                    try:
+                        book = Book(**validator.run_validation(row))
+                    except ValidationError as exc:
+                        error = as_serializer_error(exc)
+                    else:
+                        if book.pk is None:
+                            new_books.append(book)
+                        else:
+                            # A repeated id within a batch: the last row wins
+                            books[book.pk] = book
+                        continue
+                totals['failed'] += 1
+                if len(errors) < BULK_MAX_REPORTED_ERRORS:
+                    errors.append({'row': number, 'errors': error})
+            created, updated = self.write(list(books.values()), new_books)
+            totals['created'] += created
+            totals['updated'] += updated
+        return Response({**totals, 'errors': errors}, status=status.HTTP_200_OK)
+
+    def write(self, books, new_books):
+        if not books and not new_books:
+            return 0, 0
+        with transaction.atomic():
+            existing = set(Book.objects.filter(pk__in=[book.pk for book in books]).values_list('pk', flat=True))
+            if books:
+                Book.objects.bulk_create(
+                    books,
+                    update_conflicts=True,
+                    unique_fields=['id'],
+                    update_fields=['title', 'author'],
+                )
+            # Rows without an id can't conflict: a plain INSERT is enough
+            Book.objects.bulk_create(new_books)
+            # bulk_create sends no signals: log the batch for the sync API
+            # (new books have their ids set by now)
+            BookChange.record([book.pk for book in books + new_books])
+            # Cached list responses go stale as soon as this batch commits
+            bump_books_version()
+        return len(books) - len(existing) + len(new_books), len(existing)
+
+
+def integer_param(request, name, default):
+    """Query parameter ``name`` as an int; a 400 keyed by ``name`` if it isn't one."""
+    try:
+        return int(request.query_params.get(name, default))
+    except ValueError:
+        raise ValidationError({name: f'{name} must be an integer.'})
+
+
+class BookChangesView(APIView):
+    """
+    GET /api/books/changes/?since=<token>&limit=...
+
+    Books created, updated or deleted after ``since`` (0 or absent: all of
+    them), oldest change first. Each change carries the book or a
+    tombstone; pass the returned ``since`` back to continue.
+    """
+
+    def get(self, request):
+        since = max(integer_param(request, 'since', 0), 0)
+        limit = integer_param(request, 'limit', CHANGES_PAGE_SIZE)
+        changes, since, has_more = changes_since(since, min(max(limit, 1), CHANGES_MAX_PAGE_SIZE))
+        return Response({'changes': changes, 'since': since, 'has_more': has_more})
+
+
+# Exports are streamed, not rendered: these renderers take part in content
+# negotiation and otherwise only render error responses (as JSON).
+
+class NDJSONRenderer(JSONRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(JSONRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class BookExportView(APIView):
+    """
+    GET /api/books/export/?format=ndjson|csv&gzip=1 (or an Accept header).
+
+    Streams every book, so the body is never built in memory.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request):
+        export_format = request.accepted_renderer.format
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        response = StreamingHttpResponse(
+            export_books(export_format, compress=compress), content_type=request.accepted_renderer.media_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="books.{export_format}"'
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        return response
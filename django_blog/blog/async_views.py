@@ -0,0 +1,116 @@
+# blog/async_views.py
+
+"""
+Native async versions of the read-only blog views.
+
+These render the same templates and context as their counterparts in
+``blog/views.py``, but load everything through the async ORM so an ASGI
+worker can keep serving other requests while a query is in flight. They
+are mounted under ``async/`` and, with ``BLOG_ASYNC_VIEWS = True``, also
+take over the canonical feed, detail, search and tag URLs.
+
+Everything a template touches (the user, authors, tags, comments) is
+loaded before rendering, since lazy queries are not allowed from async
+code. The feed always uses cursor pagination, and pages are cached with
+``async_cached_page`` rather than through ETag validators.
+"""
+
+from django.shortcuts import aget_object_or_404, render
+
+from .caching import async_cached_page
+from .forms import CommentForm
+from .models import Comment, Post
+from .pagination import CursorPaginator
+from .routers import read_from_replica
+from .search import MATCH_COUNT_CAP, acount_matches, asearch_posts
+from .tags import TAG_CLOUD_SCOPE, apopular_tags
+from .views import (
+    COMMENTS_PER_PAGE,
+    POPULAR_TAGS_LIMIT,
+    SEARCH_MAX_PAGES,
+    SEARCH_RESULTS_PER_PAGE,
+    PostListView,
+)
+
+
+async def resolve_user(request):
+    # Templates read request.user; swap the lazy object for the loaded user
+    request.user = await request.auser()
+    return request.user
+
+
+def _feed_scopes(tag_slug=None):
+    return [f'tag:{tag_slug}' if tag_slug else 'feed', TAG_CLOUD_SCOPE]
+
+
+@read_from_replica
+@async_cached_page('post-list', _feed_scopes)
+async def post_list(request, tag_slug=None):
+    await resolve_user(request)
+    queryset = Post.objects.filter(tags__slug=tag_slug) if tag_slug else Post.objects.all()
+    paginator = CursorPaginator(queryset.for_listing(), PostListView.paginate_by)
+    page = await paginator.apage(request.GET.get('cursor'))
+
+    context = {
+        'posts': page.object_list,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.previous_cursor,
+        'popular_tags': await apopular_tags(POPULAR_TAGS_LIMIT),
+    }
+    if tag_slug:
+        context['title'] = f"Posts Tagged: {tag_slug}"
+    return render(request, 'blog/home.html', context)
+
+
+async def get_comment_page(post_id, cursor=None):
+    comments = Comment.objects.filter(post_id=post_id).select_related('author')
+    paginator = CursorPaginator(comments, COMMENTS_PER_PAGE, field='created_at', descending=False)
+    return await paginator.apage(cursor)
+
+
+@read_from_replica
+@async_cached_page('post-detail', lambda pk: [f'post:{pk}'])
+async def post_detail(request, pk):
+    await resolve_user(request)
+    post = await aget_object_or_404(Post.objects.select_related('author').with_tags(), pk=pk)
+    context = {
+        'post': post,
+        'object': post,
+        'form': CommentForm(),
+        'comments': await get_comment_page(post.pk, request.GET.get('comments')),
+    }
+    return render(request, 'blog/post_detail.html', context)
+
+
+@read_from_replica
+async def post_search(request):
+    await resolve_user(request)
+    query = request.GET.get('q', '').strip()
+    try:
+        page_number = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page_number = 1
+
+    page_number = min(page_number, SEARCH_MAX_PAGES)
+
+    posts = []
+    total = 0
+    if query:
+        offset = (page_number - 1) * SEARCH_RESULTS_PER_PAGE
+        posts = await asearch_posts(query, SEARCH_RESULTS_PER_PAGE + 1, offset)
+        total = await acount_matches(query, MATCH_COUNT_CAP)
+    has_next = len(posts) > SEARCH_RESULTS_PER_PAGE and page_number < SEARCH_MAX_PAGES
+
+    context = {
+        'posts': posts[:SEARCH_RESULTS_PER_PAGE],
+        'query': query,
+        'total': min(total, MATCH_COUNT_CAP),
+        'total_capped': total > MATCH_COUNT_CAP,
+        'page_number': page_number,
+        'has_next': has_next,
+        'has_previous': page_number > 1,
+        'title': f'Search Results for "{query}"'
+    }
+    return render(request, 'blog/search_results.html', context)
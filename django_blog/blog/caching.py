@@ -0,0 +1,251 @@
+# blog/caching.py
+
+"""
+Version-keyed caching of rendered blog pages, plus HTTP conditional GET.
+
+Every cached page is stored under the current *version* of the scopes it
+depends on: ``feed`` (the home feed), ``tag:<slug>`` (a tag feed) and
+``post:<id>`` (a post's detail page). Writes never delete entries; they bump
+the versions of the affected scopes (see ``blog/signals.py``), which makes
+every page rendered from the old data unreachable at once. Stale entries
+simply age out of the cache.
+
+Only anonymous GET requests are cached, since pages for signed-in users
+contain per-user links and forms.
+
+``ConditionalGetMixin`` adds ETag/Last-Modified validators computed from
+``Post.updated_at`` (touched on every post, tag and comment change) before
+anything is rendered, so repeat readers get a ``304 Not Modified``.
+
+``async_cached_page`` is the same page cache for the async views in
+``blog/async_views.py``; both share entries since they render the same HTML.
+"""
+
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django.views.decorators.http import condition
+
+# Response headers stored along with a cached page
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[getattr(settings, 'BLOG_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'BLOG_CACHE_TIMEOUT', 300)
+
+
+def _version_key(scope):
+    return f'blog:version:{scope}'
+
+
+def get_versions(scopes):
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        # Fresh versions are timestamps, so a version evicted from the cache
+        # can never come back as a number that old entries were stored under.
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(scopes):
+    cache = get_cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = await cache.aget_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(scopes):
+    scopes = set(scopes)
+    if scopes:
+        get_cache().set_many({_version_key(scope): time.time_ns() for scope in scopes}, None)
+
+
+def invalidate(*scopes):
+    """Bump the given scopes once the surrounding transaction commits."""
+    transaction.on_commit(lambda: bump_versions(scopes))
+
+
+def post_scopes(post_id, tag_slugs=()):
+    # Everything that renders a post: the feed, its detail page and its tag feeds
+    return ['feed', f'post:{post_id}'] + [f'tag:{slug}' for slug in tag_slugs]
+
+
+def _page_key(name, versions, path):
+    versions = '.'.join(str(version) for version in versions)
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f'blog:page:{name}:{versions}:{digest}'
+
+
+def page_key(name, scopes, path):
+    return _page_key(name, get_versions(scopes), path)
+
+
+async def apage_key(name, scopes, path):
+    return _page_key(name, await aget_versions(scopes), path)
+
+
+def record(hit):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+class CachedPageMixin:
+    """
+    Serves anonymous GETs of a view from the cache.
+
+    Views list the scopes their output depends on in ``get_cache_scopes()``.
+    Put it before ``ConditionalGetMixin`` so cache hits skip the validator
+    queries entirely.
+    """
+
+    cache_name = None
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = page_key(self.cache_name, self.get_cache_scopes(), request.get_full_path())
+        cached = cache.get(key)
+        if cached is not None:
+            record(hit=True)
+            return cached_response(request, cached)
+
+        record(hit=False)
+        response = super().get(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.status_code == 200:
+            cache.set(key, cache_entry(response), get_timeout())
+        response['X-Blog-Cache'] = 'miss'
+        return response
+
+
+def cache_entry(response):
+    headers = {h: response[h] for h in CACHED_HEADERS if response.has_header(h)}
+    return response.content, headers
+
+
+def cached_response(request, entry):
+    content, headers = entry
+    response = HttpResponse(content)
+    for header, value in headers.items():
+        response[header] = value
+    response['X-Blog-Cache'] = 'hit'
+    # Validators were stored with the page, so a hit can still answer 304
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+        response=response,
+    )
+
+
+def async_cached_page(name, get_scopes):
+    """
+    ``CachedPageMixin`` for async function views.
+
+    ``get_scopes`` receives the view's URL kwargs. The wrapped view must
+    resolve ``request.user`` itself, which happens here for cached requests.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if request.method != 'GET' or user.is_authenticated:
+                return await view(request, *args, **kwargs)
+
+            cache = get_cache()
+            key = await apage_key(name, get_scopes(**kwargs), request.get_full_path())
+            cached = await cache.aget(key)
+            if cached is not None:
+                record(hit=True)
+                return cached_response(request, cached)
+
+            record(hit=False)
+            response = await view(request, *args, **kwargs)
+            if response.status_code == 200:
+                await cache.aset(key, cache_entry(response), get_timeout())
+            response['X-Blog-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
+
+
+def viewer_key(request):
+    # Pages differ per signed-in user (edit links, forms), so validators do too
+    if not request.user.is_authenticated:
+        return 'anon'
+    # Their forms embed a CSRF token, which only works with the CSRF cookie it
+    # came from: a new cookie (e.g. rotated on login) must not get a 304
+    get_token(request)
+    return f"user-{request.user.pk}:{request.META['CSRF_COOKIE']}"
+
+
+def rows_etag(request, rows, scopes=()):
+    """
+    ETag for a page built from the ``(pk, updated_at)`` of the posts it shows,
+    plus the versions of any other ``scopes`` it renders (e.g. the tag cloud).
+    """
+    parts = [viewer_key(request)] + [f'{row.pk}:{row.updated_at.timestamp()}' for row in rows]
+    parts += [f'{scope}:{version}' for scope, version in zip(scopes, get_versions(scopes))]
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    Answers GETs with ``304 Not Modified`` when the client's copy is current.
+
+    Views supply cheap validators through ``get_etag()`` and optionally
+    ``get_last_modified()``; both run before the page is built.
+    """
+
+    def get_etag(self):
+        return None
+
+    def get_last_modified(self):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        conditional = condition(
+            etag_func=lambda request, *args, **kwargs: self.get_etag(),
+            last_modified_func=lambda request, *args, **kwargs: self.get_last_modified(),
+        )
+        return conditional(super().get)(request, *args, **kwargs)
@@ -0,0 +1,189 @@
+# blog/export.py
+
+"""
+Streaming export of posts as NDJSON or CSV.
+
+Rows are read with ``.iterator(chunk_size=...)``, so neither model instances
+nor the full result set are ever held in memory, and are encoded a chunk at
+a time: each chunk becomes one bytes block, optionally run through an
+incremental gzip compressor. Memory use is bounded by the chunk size
+whatever the number of posts.
+
+Most of the per-row work is left to the database, which is what makes this
+fast enough to stream hundreds of thousands of rows a second:
+
+* each line is built in SQL, with ``JSONObject`` for NDJSON and quoting
+  ``Concat``/``Replace`` expressions for CSV, and read back as text, so
+  Python neither converts nor re-encodes the column values; only the tags
+  are appended;
+* dates are reshaped from the database's own UTC text into the ISO 8601
+  form the change feed uses, skipping Django's per-value datetime parsing;
+* tags are loaded with one range query per chunk (rows come in primary key
+  order) instead of a prefetch or a large ``IN`` list, and each tag's name
+  is fetched and encoded once per export.
+
+Responses are streamed after the view has returned, outside any per-request
+database routing, so callers pass the alias to read from explicitly.
+"""
+
+import json
+import sys
+import zlib
+from itertools import islice
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import TextField, Value
+from django.db.models.functions import Cast, Concat, JSONObject, Replace, Substr
+from taggit.models import Tag, TaggedItem
+
+from .models import Post
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_CHUNK_SIZE = 5000
+# Level 1 compresses about five times faster than the default 6 and still
+# shrinks text exports to around a third
+EXPORT_GZIP_LEVEL = 1
+
+POST_FIELDS = ('id', 'title', 'content', 'author', 'published_date', 'updated_at', 'comment_count', 'tags')
+# Free-text CSV columns, always quoted; the rest never need quoting
+CSV_QUOTED = {'title', 'content', 'author', 'tags'}
+CSV_LINE_END = '\r\n'
+
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def _as_text(field):
+    return Cast(field, output_field=TextField())
+
+
+def _as_iso(field):
+    """
+    A datetime column as ``DjangoJSONEncoder`` writes it in the change feed:
+    the stored ``YYYY-MM-DD HH:MM:SS[.ffffff]`` UTC text with a ``T``, the
+    fraction cut to milliseconds and a ``Z``.
+    """
+    text = _as_text(field)
+    return Concat(Substr(text, 1, 10), Value('T'), Substr(text, 12, 12), Value('Z'), output_field=TextField())
+
+
+def _post_columns():
+    """Expressions for every field but the tags, in ``POST_FIELDS`` order."""
+    return {
+        'id': 'id',
+        'title': 'title',
+        'content': 'content',
+        'author': 'author__username',
+        'published_date': _as_iso('published_date'),
+        'updated_at': _as_iso('updated_at'),
+        'comment_count': 'comment_count',
+    }
+
+
+def _post_chunks(using, columns, chunk_size):
+    """Lists of up to ``chunk_size`` rows, each ``(id, *columns)``, oldest post first."""
+    rows = Post.objects.using(using).order_by('pk').values_list('id', *columns).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def _tag_ids_by_post(using, first_id, last_id):
+    """``{post id: [tag ids]}`` for the posts with ids in ``[first_id, last_id]``."""
+    tag_ids = {}
+    tagged = TaggedItem.objects.using(using).filter(
+        content_type=ContentType.objects.get_for_model(Post),
+        object_id__gte=first_id,
+        object_id__lte=last_id,
+    ).order_by('object_id', 'tag_id').values_list('object_id', 'tag_id')
+    for post_id, tag_id in tagged:
+        tag_ids.setdefault(post_id, []).append(tag_id)
+    return tag_ids
+
+
+def _load_tag_names(using, tag_ids, names, encode=str):
+    """
+    Add ``encode(name)`` to ``names`` for each of ``tag_ids`` not yet in it:
+    tags repeat across chunks, so each is fetched and encoded only once.
+    """
+    missing = {tag_id for ids in tag_ids.values() for tag_id in ids} - names.keys()
+    if missing:
+        names.update(
+            (tag_id, encode(name))
+            for tag_id, name in Tag.objects.using(using).filter(id__in=missing).values_list('id', 'name')
+        )
+
+
+def _ndjson_blocks(using, chunk_size):
+    line = _as_text(JSONObject(**_post_columns()))
+    names = {}
+    for chunk in _post_chunks(using, [line], chunk_size):
+        tag_ids = _tag_ids_by_post(using, chunk[0][0], chunk[-1][0])
+        _load_tag_names(using, tag_ids, names, lambda name: json.dumps(name, ensure_ascii=False))
+        # Each line is a complete JSON object: splice the tags in before its '}'
+        lines = [
+            f'{text[:-1]},"tags":[{",".join([names[tag_id] for tag_id in tag_ids.get(post_id, ())])}]}}'
+            for post_id, text in chunk
+        ]
+        lines.append('')
+        yield '\n'.join(lines).encode()
+
+
+def _csv_field(field):
+    """A text column as an always-quoted CSV field (RFC 4180)."""
+    quote = Value('"')
+    return Concat(quote, Replace(field, quote, Value('""')), quote, output_field=TextField())
+
+
+def _csv_blocks(using, chunk_size):
+    columns = _post_columns()
+    fields = [
+        _csv_field(column) if name in CSV_QUOTED else _as_text(column)
+        for name, column in columns.items()
+    ]
+    separated = [Value(',')] * (2 * len(fields) - 1)
+    separated[::2] = fields
+    line = Concat(*separated, output_field=TextField())
+
+    names = {}
+    yield (','.join(POST_FIELDS) + CSV_LINE_END).encode()
+    for chunk in _post_chunks(using, [line], chunk_size):
+        tag_ids = _tag_ids_by_post(using, chunk[0][0], chunk[-1][0])
+        _load_tag_names(using, tag_ids, names, lambda name: name.replace('"', '""'))
+        lines = [
+            f'{text},"{",".join([names[tag_id] for tag_id in tag_ids.get(post_id, ())])}"'
+            for post_id, text in chunk
+        ]
+        lines.append('')
+        yield CSV_LINE_END.join(lines).encode()
+
+
+def gzip_blocks(blocks, level=EXPORT_GZIP_LEVEL):
+    """Compress a stream of bytes blocks into one gzip stream, incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        if compressed := compressor.compress(block):
+            yield compressed
+    yield compressor.flush()
+
+
+def write_blocks(blocks, path=None):
+    """Write a stream of bytes blocks to ``path`` (default: stdout); return the bytes written."""
+    written = 0
+    output = open(path, 'wb') if path else sys.stdout.buffer
+    try:
+        for block in blocks:
+            output.write(block)
+            written += len(block)
+    finally:
+        if path:
+            output.close()
+        else:
+            output.flush()
+    return written
+
+
+def export_posts(export_format='ndjson', chunk_size=EXPORT_CHUNK_SIZE, compress=False, using=None):
+    """Every post on database ``using``, oldest first, as a stream of encoded bytes blocks."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format {export_format!r}')
+    blocks = _ndjson_blocks(using, chunk_size) if export_format == 'ndjson' else _csv_blocks(using, chunk_size)
+    return gzip_blocks(blocks) if compress else blocks
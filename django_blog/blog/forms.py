@@ -4,18 +4,17 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
+from .models import Comment
+
+
 # Extends the default form to require/include the email field
 class UserRegisterForm(UserCreationForm):
     email = forms.EmailField()
 
     class Meta:
         model = User
-        fields = ['username', 'email', 'password', 'password2']
-# blog/forms.py (ADDITIONS)
-
-from .models import Comment # <-- NEW IMPORT
+        fields = ['username', 'email', 'password1', 'password2']
 
-# ... (Keep existing UserRegisterForm definition) ...
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,189 @@
+# blog/management/commands/benchmark_concurrency.py
+
+import asyncio
+import io
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.test import override_settings
+from django.urls import reverse
+
+from blog.models import Post
+from blog.tags import top_tags
+
+# (label, server interface, URL names to request)
+MODES = {
+    'wsgi': ('WSGI, sync views', 'wsgi', ('blog-home', 'post-detail', 'post-search', 'posts-by-tag')),
+    'asgi-sync': ('ASGI, sync views', 'asgi', ('blog-home', 'post-detail', 'post-search', 'posts-by-tag')),
+    'asgi': ('ASGI, async views', 'asgi', (
+        'async-blog-home', 'async-post-detail', 'async-post-search', 'async-posts-by-tag',
+    )),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of the read endpoints under concurrent load when served "
+        "through Django's WSGI handler (a thread per in-flight request, as with "
+        "gunicorn/mod_wsgi threads) and its ASGI handler (one event loop, as with "
+        "uvicorn), with the sync and the native async views. Requests are driven "
+        "in-process, so the numbers exclude network and server parsing overhead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help='Requests per mode.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once.')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not Post.objects.exists():
+            raise CommandError('No posts to benchmark; run `manage.py seed_blog` first.')
+
+        overrides = {
+            'ALLOWED_HOSTS': ['testserver'],
+            # Every request does the full work instead of hitting the page cache
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        }
+        with override_settings(**overrides):
+            targets = self.targets(random.Random(options['seed']), options['requests'])
+            self.stdout.write(
+                f"{'mode':<22}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+            )
+            for mode in options['modes']:
+                label, interface, names = MODES[mode]
+                urls = [targets[names[i % len(names)]][i] for i in range(options['requests'])]
+                run = self.run_wsgi if interface == 'wsgi' else self.run_asgi
+                self.report(label, *run(urls, options['concurrency']))
+
+    def targets(self, rng, count):
+        bounds = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        posts = [
+            Post.objects.filter(pk__gte=rng.randint(bounds['low'], bounds['high'])).order_by('pk').first()
+            for _ in range(min(count, 50))
+        ]
+        tags = [tag.slug for tag, _ in top_tags(10)] or ['none']
+        terms = [post.title.split()[0] for post in posts if post.title.split()] or ['post']
+
+        def cycle(values):
+            return [values[i % len(values)] for i in range(count)]
+
+        targets = {}
+        for prefix in ('', 'async-'):
+            targets[f'{prefix}blog-home'] = [reverse(f'{prefix}blog-home')] * count
+            targets[f'{prefix}post-detail'] = [
+                reverse(f'{prefix}post-detail', kwargs={'pk': post.pk}) for post in cycle(posts)
+            ]
+            targets[f'{prefix}post-search'] = [
+                f"{reverse(f'{prefix}post-search')}?q={term}" for term in cycle(terms)
+            ]
+            targets[f'{prefix}posts-by-tag'] = [
+                reverse(f'{prefix}posts-by-tag', kwargs={'tag_slug': slug}) for slug in cycle(tags)
+            ]
+        return targets
+
+    def run_wsgi(self, urls, concurrency):
+        application = WSGIHandler()
+
+        def request(url):
+            parts = urlsplit(url)
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': parts.path,
+                'QUERY_STRING': parts.query,
+                'SCRIPT_NAME': '',
+                'SERVER_NAME': 'testserver',
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'testserver',
+                'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.version': (1, 0),
+                'wsgi.url_scheme': 'http',
+                'wsgi.input': io.BytesIO(),
+                'wsgi.errors': sys.stderr,
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            statuses = []
+            started = time.perf_counter()
+            response = application(environ, lambda status, headers: statuses.append(status))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return time.perf_counter() - started, statuses[0].startswith('200')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(request, urls))
+        return results, time.perf_counter() - started
+
+    def run_asgi(self, urls, concurrency):
+        application = ASGIHandler()
+
+        async def request(url, limit):
+            parts = urlsplit(url)
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': parts.path,
+                'raw_path': parts.path.encode(),
+                'query_string': parts.query.encode(),
+                'root_path': '',
+                'headers': [(b'host', b'testserver')],
+                'client': ('127.0.0.1', 0),
+                'server': ('testserver', 80),
+            }
+            body_sent = False
+            disconnected = asyncio.Event()
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The client stays connected until the handler has responded
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            statuses = []
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with limit:
+                started = time.perf_counter()
+                await application(scope, receive, send)
+                elapsed = time.perf_counter() - started
+            disconnected.set()
+            return elapsed, statuses[0] == 200
+
+        async def run():
+            limit = asyncio.Semaphore(concurrency)
+            started = time.perf_counter()
+            results = await asyncio.gather(*(request(url, limit) for url in urls))
+            return results, time.perf_counter() - started
+
+        return asyncio.run(run())
+
+    def report(self, label, results, elapsed):
+        timings = [timing for timing, _ in results]
+        errors = sum(1 for _, ok in results if not ok)
+        percentiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        self.stdout.write(
+            f"{label:<22}{len(results) / elapsed:>10.1f}{percentiles[49] * 1000:>10.2f}"
+            f"{percentiles[94] * 1000:>10.2f}{errors:>8}"
+        )
@@ -0,0 +1,176 @@
+# blog/management/commands/benchmark_indexes.py
+
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blog.models import Comment, Post
+from blog.pagination import CursorPaginator, encode_cursor
+
+ALIAS = 'index_benchmark'
+
+# Single-column foreign key indexes the tables had before the composite ones
+BASELINE_INDEXES = {
+    'bench_blog_post_author_id': ('blog_post', 'author_id'),
+    'bench_blog_comment_post_id': ('blog_comment', 'post_id'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch SQLite database and compare the query plans and timings "
+        "of the hot blog queries with the old single-column indexes and with "
+        "the composite indexes declared on Post and Comment."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=500000)
+        parser.add_argument('--comments', type=int, default=500000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query; the median is reported.')
+        parser.add_argument(
+            '--db', help='Scratch database file, kept for inspection afterwards (default: a temporary one).',
+        )
+        parser.add_argument('--force', action='store_true', help='Overwrite the --db file if it exists.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            if options['db']:
+                path = Path(options['db'])
+                if path.exists() and not options['force']:
+                    raise CommandError(f'{path} already exists; pass --force to overwrite it.')
+                path.unlink(missing_ok=True)
+            else:
+                # Removed along with the directory
+                path = Path(directory) / 'benchmark.sqlite3'
+
+            connections.settings[ALIAS] = {**connections.settings['default'], 'NAME': str(path)}
+            try:
+                self.run(options)
+            finally:
+                connections[ALIAS].close()
+                del connections[ALIAS]
+                del connections.settings[ALIAS]
+
+    def run(self, options):
+        connection = connections[ALIAS]
+        call_command('migrate', database=ALIAS, verbosity=0)
+
+        started = time.perf_counter()
+        self.seed(connection, options)
+        self.stdout.write(
+            f"Seeded {options['posts']} posts and {options['comments']} comments "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        indexes = [(Post, index) for index in Post._meta.indexes]
+        indexes += [(Comment, index) for index in Comment._meta.indexes]
+        queries = self.hot_queries(connection, options)
+
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+            for name, (table, column) in BASELINE_INDEXES.items():
+                editor.execute(f'CREATE INDEX {name} ON {table} ({column})')
+        before = self.measure(connection, queries, options['repeat'])
+
+        with connection.schema_editor() as editor:
+            for name in BASELINE_INDEXES:
+                editor.execute(f'DROP INDEX {name}')
+            for model, index in indexes:
+                editor.add_index(model, index)
+        after = self.measure(connection, queries, options['repeat'])
+
+        for label in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}'))
+            for state, results in (('before', before), ('after', after)):
+                median, plan = results[label]
+                self.stdout.write(f'  {state:<6} {median * 1000:9.3f} ms')
+                for step in plan:
+                    self.stdout.write(f'           {step}')
+
+    def seed(self, connection, options):
+        rng = random.Random(options['seed'])
+        now = datetime.now(dt_timezone.utc).replace(tzinfo=None)
+        span = int(timedelta(days=5 * 365).total_seconds())
+
+        def stamp(seconds_ago):
+            return (now - timedelta(seconds=seconds_ago)).isoformat(sep=' ')
+
+        with connection.cursor() as cursor:
+            cursor.execute('BEGIN')
+            cursor.executemany(
+                'INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, '
+                'email, is_staff, is_active, date_joined) VALUES (%s, 0, %s, %s, %s, %s, 0, 1, %s)',
+                [('!', f'bench{i}', '', '', '', stamp(0)) for i in range(options['authors'])],
+            )
+            cursor.execute('SELECT MIN(id) FROM auth_user')
+            first_author = cursor.fetchone()[0]
+
+            for start in range(0, options['posts'], 50000):
+                rows = []
+                for _ in range(start, min(start + 50000, options['posts'])):
+                    published = stamp(rng.randrange(span))
+                    rows.append((
+                        'Benchmark post', 'Lorem ipsum dolor sit amet.', published, published,
+                        first_author + rng.randrange(options['authors']),
+                    ))
+                cursor.executemany(
+                    'INSERT INTO blog_post (title, content, published_date, updated_at, author_id, '
+                    'comment_count) VALUES (%s, %s, %s, %s, %s, 0)',
+                    rows,
+                )
+
+            for start in range(0, options['comments'], 50000):
+                rows = []
+                for _ in range(start, min(start + 50000, options['comments'])):
+                    created = stamp(rng.randrange(span))
+                    rows.append((
+                        1 + rng.randrange(options['posts']),
+                        first_author + rng.randrange(options['authors']),
+                        'Nice post.', created, created,
+                    ))
+                cursor.executemany(
+                    'INSERT INTO blog_comment (post_id, author_id, content, created_at, updated_at) '
+                    'VALUES (%s, %s, %s, %s, %s)',
+                    rows,
+                )
+            cursor.execute('COMMIT')
+
+    def hot_queries(self, connection, options):
+        posts = Post.objects.using(ALIAS)
+        middle = posts.order_by('-published_date', '-pk')[options['posts'] // 2]
+        author_id = posts.values_list('author_id', flat=True).first()
+        post_id = Comment.objects.using(ALIAS).values_list('post_id', flat=True).first()
+        return {
+            'Home feed, first page': posts.order_by('-published_date', '-pk')[:6],
+            'Home feed, deep keyset page': CursorPaginator(posts, 5).get_page_queryset(encode_cursor(middle)),
+            'Posts by author': posts.filter(author_id=author_id).order_by('-published_date')[:6],
+            'Comments on a post': Comment.objects.using(ALIAS).filter(post_id=post_id)
+            .order_by('created_at', 'pk')[:21],
+        }
+
+    def measure(self, connection, queries, repeat):
+        results = {}
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            for label, queryset in queries.items():
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = [row[-1] for row in cursor.fetchall()]
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    timings.append(time.perf_counter() - started)
+                results[label] = (statistics.median(timings), plan)
+        return results
@@ -0,0 +1,157 @@
+# blog/management/commands/benchmark_requests.py
+
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.models import Post
+from blog.pagination import encode_cursor
+from blog.tags import top_tags
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+# Metrics compared against the baseline, and how much worse they may get
+# (timings use --threshold; query counts must not grow at all)
+TIMED_METRICS = ('p50_ms', 'p95_ms')
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the read endpoints (home, deep feed page, detail, search, tag feed) "
+        "against the configured database with the Django test client. Reports latency "
+        "percentiles, queries and peak memory per endpoint, and compares with a JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint.')
+        parser.add_argument('--memory-requests', type=int, default=10,
+                            help='Requests per endpoint traced for peak memory.')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Write this run as the new baseline instead of comparing.')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed relative slowdown before a timing counts as a regression.')
+        parser.add_argument('--with-cache', action='store_true',
+                            help='Keep the page cache on (by default every request does the full work).')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not Post.objects.exists():
+            raise CommandError('No posts to benchmark; run `manage.py seed_blog` first.')
+
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if not options['with_cache']:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        with override_settings(**overrides):
+            endpoints = self.endpoints(random.Random(options['seed']), options['requests'])
+            results = {name: self.measure(urls, options) for name, urls in endpoints.items()}
+
+        self.report(results)
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+        elif baseline_path.exists():
+            self.compare(results, json.loads(baseline_path.read_text()), options['threshold'])
+        else:
+            self.stdout.write(f'No baseline at {baseline_path}; run with --save-baseline to create one.')
+
+    def endpoints(self, rng, count):
+        bounds = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        posts = []
+        for _ in range(min(count, 50)):
+            post = Post.objects.filter(pk__gte=rng.randint(bounds['low'], bounds['high'])).order_by('pk').first()
+            posts.append(post)
+        tags = [tag.slug for tag, _ in top_tags(10)] or ['none']
+        terms = [post.title.split()[0] for post in posts if post.title.split()]
+
+        def cycle(values):
+            return [values[i % len(values)] for i in range(count)]
+
+        home = reverse('blog-home')
+        return {
+            'blog-home': [home] * count,
+            'blog-home (deep page)': [f'{home}?cursor={encode_cursor(post)}' for post in cycle(posts)],
+            'post-detail': [reverse('post-detail', kwargs={'pk': post.pk}) for post in cycle(posts)],
+            'post-search': [f"{reverse('post-search')}?q={term}" for term in cycle(terms)],
+            'posts-by-tag': [reverse('posts-by-tag', kwargs={'tag_slug': slug}) for slug in cycle(tags)],
+        }
+
+    def measure(self, urls, options):
+        client = Client()
+        client.get(urls[0])  # warm up
+
+        timings = []
+        queries = 0
+        for url in urls:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'GET {url} returned {response.status_code}')
+            queries = max(queries, len(captured))
+
+        # Memory is traced in a separate, shorter pass: tracemalloc slows everything down
+        tracemalloc.start()
+        peak = 0
+        for url in urls[:options['memory_requests']]:
+            tracemalloc.reset_peak()
+            client.get(url)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        percentiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        return {
+            'requests': len(timings),
+            'p50_ms': round(percentiles[49] * 1000, 3),
+            'p95_ms': round(percentiles[94] * 1000, 3),
+            'p99_ms': round(percentiles[98] * 1000, 3),
+            'max_queries': queries,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'endpoint':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'peak KB':>10}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<24}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{result['max_queries']:>9}{result['peak_kb']:>10.1f}"
+            )
+
+    def compare(self, results, baseline, threshold):
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            for metric in TIMED_METRICS:
+                limit = previous[metric] * (1 + threshold)
+                if result[metric] > limit:
+                    regressions.append(
+                        f'{name}: {metric} {result[metric]:.2f} > {limit:.2f} (baseline {previous[metric]:.2f})'
+                    )
+            if result['max_queries'] > previous['max_queries']:
+                regressions.append(
+                    f"{name}: queries {result['max_queries']} > baseline {previous['max_queries']}"
+                )
+
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,123 @@
+# blog/management/commands/benchmark_sessions.py
+
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.models import Post
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'blog.sessions.cached_db',
+    'cache': 'blog.sessions.cache',
+}
+# Fixed: sessions are saved only when changed (Django's default).
+# Sliding: SESSION_SAVE_EVERY_REQUEST, pushing the expiry back on each request.
+EXPIRY_MODES = ('fixed', 'sliding')
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test logged-in browsing of the feed and post pages with each session "
+        "profile (the stock database backend, and blog.sessions' cached_db and cache "
+        "engines), and report session reads, session writes and all database writes "
+        "per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Logged-in users browsing at once.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per profile and expiry mode.')
+        parser.add_argument('--profiles', nargs='+', choices=list(SESSION_ENGINES), default=list(SESSION_ENGINES))
+        parser.add_argument('--expiry', nargs='+', choices=EXPIRY_MODES, default=list(EXPIRY_MODES))
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not Post.objects.exists():
+            raise CommandError('No posts to browse; run `manage.py seed_blog` first.')
+        users = list(User.objects.order_by('pk')[:options['users']])
+        if not users:
+            raise CommandError('No users to log in as; run `manage.py seed_blog` first.')
+
+        urls = self.urls(random.Random(options['seed']), options['requests'])
+        self.stdout.write(
+            f"{'profile':<12}{'expiry':<10}{'req/s':>9}{'session reads':>15}"
+            f"{'session writes':>16}{'db writes':>11}"
+        )
+        for profile in options['profiles']:
+            for expiry in options['expiry']:
+                result = self.measure(SESSION_ENGINES[profile], expiry == 'sliding', users, urls)
+                self.stdout.write(
+                    f"{profile:<12}{expiry:<10}{result['requests_per_second']:>9.1f}"
+                    f"{result['session_reads']:>15.2f}{result['session_writes']:>16.2f}"
+                    f"{result['db_writes']:>11.2f}"
+                )
+        self.stdout.write('(reads and writes are per request)')
+
+    def urls(self, rng, count):
+        bounds = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        home = reverse('blog-home')
+        urls = []
+        for i in range(count):
+            if i % 2:
+                post_id = rng.randint(bounds['low'], bounds['high'])
+                urls.append(reverse('post-detail', kwargs={'pk': post_id}))
+            else:
+                urls.append(home)
+        return urls
+
+    def measure(self, engine, sliding, users, urls):
+        overrides = {
+            'ALLOWED_HOSTS': ['testserver'],
+            'SESSION_ENGINE': engine,
+            'SESSION_SAVE_EVERY_REQUEST': sliding,
+            'CACHES': {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'},
+                'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                             'LOCATION': 'bench-sessions'},
+            },
+            'SESSION_CACHE_ALIAS': 'sessions',
+        }
+        with override_settings(**overrides):
+            clients = []
+            for user in users:
+                client = Client()
+                client.force_login(user)
+                client.get(urls[0])  # warm up: the session's first save after login
+                clients.append(client)
+
+            session_reads = session_writes = db_writes = 0
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as captured:
+                for i, url in enumerate(urls):
+                    response = clients[i % len(clients)].get(url)
+                    if response.status_code not in (200, 404):
+                        raise CommandError(f'GET {url} returned {response.status_code}')
+            elapsed = time.perf_counter() - started
+
+            for query in captured.captured_queries:
+                sql = query['sql'].lstrip().upper()
+                write = sql.startswith(WRITE_STATEMENTS)
+                db_writes += write
+                if 'DJANGO_SESSION' in sql:
+                    session_writes += write
+                    session_reads += not write
+
+            for client in clients:
+                client.logout()
+
+        count = len(urls)
+        return {
+            'requests_per_second': count / elapsed if elapsed else 0,
+            'session_reads': session_reads / count,
+            'session_writes': session_writes / count,
+            'db_writes': db_writes / count,
+        }
@@ -0,0 +1,66 @@
+# blog/management/commands/rebuild_comment_counts.py
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Now
+from taggit.models import TaggedItem
+
+from blog import caching
+from blog.models import Comment, Post, PostChange
+
+
+def stale_post_scopes(post_ids):
+    """The cache scopes of ``post_ids``, as the signal handlers bump them, with one tags query."""
+    slugs = {post_id: [] for post_id in post_ids}
+    tagged = TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Post), object_id__in=post_ids,
+    ).values_list('object_id', 'tag__slug')
+    for post_id, slug in tagged:
+        slugs[post_id].append(slug)
+    scopes = {}
+    for post_id, post_slugs in slugs.items():
+        scopes.update(dict.fromkeys(caching.post_scopes(post_id, post_slugs)))
+    return list(scopes)
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalised Post.comment_count column from the comments table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Number of posts (by id range) updated per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        counts = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by().values('post').annotate(total=Count('pk')).values('total')
+        )
+        last_id = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+
+        updated = 0
+        # One UPDATE ... SET comment_count = (SELECT COUNT(*) ...) per id range,
+        # so no rows are loaded into Python and each transaction stays short.
+        for start in range(0, last_id, batch_size):
+            batch = Post.objects.filter(pk__gt=start, pk__lte=start + batch_size)
+            with transaction.atomic():
+                # Only posts whose count is actually wrong are rewritten; like
+                # any other edit they get a new updated_at (the detail page's
+                # validator), a change-feed entry and fresh cached pages
+                stale = list(
+                    batch.annotate(actual=Coalesce(Subquery(counts), 0))
+                    .exclude(comment_count=F('actual')).values_list('pk', flat=True)
+                )
+                if stale:
+                    updated += Post.objects.filter(pk__in=stale).update(
+                        comment_count=Coalesce(Subquery(counts), 0), updated_at=Now(),
+                    )
+                    PostChange.record(stale)
+                    caching.invalidate(*stale_post_scopes(stale))
+            self.stdout.write(f'  ... {min(start + batch_size, last_id)}/{last_id}')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt comment counts for {updated} posts.'))
@@ -0,0 +1,14 @@
+# blog/management/commands/rebuild_tag_counts.py
+
+from django.core.management.base import BaseCommand
+
+from blog.models import TagUsage
+from blog.tags import rebuild_tag_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialised TagUsage counts from taggit's tagged items."
+
+    def handle(self, *args, **options):
+        rebuild_tag_counts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt usage counts for {TagUsage.objects.count()} tags.'))
@@ -0,0 +1,159 @@
+# blog/management/commands/seed_blog.py
+
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from taggit.models import Tag, TaggedItem
+
+from blog import caching, search
+from blog.tags import rebuild_tag_counts
+from blog.models import Comment, Post, PostChange
+
+WORDS = (
+    'django python cache query index feed search tag comment template view model '
+    'database sqlite latency throughput page cursor request response server client '
+    'deploy worker thread async stream batch bulk profile metric benchmark schema'
+).split()
+
+
+def zipf_weights(n, exponent):
+    # Cumulative weights for rank-frequency (power-law) sampling
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create users, posts, comments and tags with skewed (power-law) "
+        "distributions for load testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--tags', type=int, default=200, help='Size of the tag vocabulary.')
+        parser.add_argument('--max-tags-per-post', type=int, default=4)
+        parser.add_argument(
+            '--comments-alpha', type=float, default=1.3,
+            help='Pareto shape for comments per post; lower means a heavier tail.',
+        )
+        parser.add_argument('--max-comments-per-post', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=3 * 365, help='Spread posts over this many days.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for repeatable data.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        authors = self.create_users(options['users'])
+        tags = self.create_tags(options['tags'])
+        totals = self.create_posts(authors, tags, options)
+        # bulk_create skips the tag signals, so recount tag usage in one pass
+        rebuild_tag_counts()
+
+        # Pages rendered before seeding are out of date now
+        caching.bump_versions(['feed'] + [f'tag:{tag.slug}' for tag in tags])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(authors)} users, {totals['posts']} posts, {totals['comments']} comments "
+            f"and {totals['tagged']} tag links in {elapsed:.1f}s."
+        ))
+
+    def progress(self, label, done, total, started):
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(f'  {label}: {done}/{total} ({rate:,.0f}/s)')
+        self.stdout.flush()
+
+    def create_users(self, count):
+        prefix = f'seed{self.rng.getrandbits(32):08x}_'
+        started = time.perf_counter()
+        for start in range(0, count, self.batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    User(username=f'{prefix}{i}', password='!')  # unusable password
+                    for i in range(start, min(start + self.batch_size, count))
+                )
+            self.progress('users', min(start + self.batch_size, count), count, started)
+        return list(User.objects.filter(username__startswith=prefix).values_list('pk', flat=True))
+
+    def create_tags(self, count):
+        names = [f'{WORDS[i % len(WORDS)]}{i // len(WORDS) or ""}' for i in range(count)]
+        Tag.objects.bulk_create([Tag(name=name, slug=name) for name in names], ignore_conflicts=True)
+        by_name = Tag.objects.in_bulk(names, field_name='name')
+        # Keep vocabulary order: the first tags are the most popular ones
+        return [by_name[name] for name in names]
+
+    def sentence(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words)).capitalize()
+
+    def comments_for_post(self, options):
+        count = int(self.rng.paretovariate(options['comments_alpha'])) - 1
+        return min(count, options['max_comments_per_post'])
+
+    def create_posts(self, authors, tags, options):
+        total = options['posts']
+        author_weights = zipf_weights(len(authors), 1.1)
+        tag_weights = zipf_weights(len(tags), 1.0)
+        post_type = ContentType.objects.get_for_model(Post)
+        now = timezone.now()
+        span = int(timedelta(days=options['days']).total_seconds())
+
+        totals = {'posts': 0, 'comments': 0, 'tagged': 0}
+        started = time.perf_counter()
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            posts, post_tags = [], []
+            for author_id in self.rng.choices(authors, cum_weights=author_weights, k=size):
+                picked = self.rng.choices(
+                    tags, cum_weights=tag_weights, k=self.rng.randint(0, options['max_tags_per_post'])
+                )
+                post_tags.append({tag.pk: tag for tag in picked}.values())
+                posts.append(Post(
+                    title=self.sentence(self.rng.randint(3, 8)),
+                    content='. '.join(self.sentence(12) for _ in range(self.rng.randint(2, 8))),
+                    published_date=now - timedelta(seconds=self.rng.randrange(span)),
+                    author_id=author_id,
+                    comment_count=self.comments_for_post(options),
+                ))
+
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+                # bulk_create skips signals, so log the new posts for the sync feed
+                PostChange.record(post.pk for post in posts)
+                tagged = [
+                    TaggedItem(tag=tag, content_type=post_type, object_id=post.pk)
+                    for post, picked in zip(posts, post_tags) for tag in picked
+                ]
+                TaggedItem.objects.bulk_create(tagged)
+                commenters = iter(self.rng.choices(
+                    authors, cum_weights=author_weights, k=sum(post.comment_count for post in posts)
+                ))
+                comments = [
+                    Comment(
+                        post_id=post.pk,
+                        author_id=next(commenters),
+                        content=self.sentence(self.rng.randint(4, 20)),
+                    )
+                    for post in posts for _ in range(post.comment_count)
+                ]
+                Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+                # bulk_create skips signals, so index the batch directly
+                search.bulk_index(
+                    (post.pk, post.title, post.content, [tag.name for tag in picked])
+                    for post, picked in zip(posts, post_tags)
+                )
+
+            totals['posts'] += size
+            totals['comments'] += len(comments)
+            totals['tagged'] += len(tagged)
+            self.progress('posts', totals['posts'], total, started)
+        return totals
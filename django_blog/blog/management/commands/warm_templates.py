@@ -0,0 +1,29 @@
+# blog/management/commands/warm_templates.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.template_cache import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        "Parse every project and blog template through the configured loaders. "
+        "Workers do this at start-up with BLOG_WARM_TEMPLATES; run it at deploy "
+        "time to fail early on template syntax errors and see parse costs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--app', action='append', dest='apps', default=None,
+                            help='App whose templates to load (repeatable; default: blog).')
+
+    def handle(self, *args, **options):
+        timings, errors = warm_templates(tuple(options['apps'] or ['blog']))
+        if options['verbosity'] > 1:
+            for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+                self.stdout.write(f'{seconds * 1000:8.2f} ms  {name}')
+        if errors:
+            raise CommandError('Templates failed to compile:\n  ' + '\n  '.join(
+                f'{name}: {message}' for name, message in sorted(errors.items())
+            ))
+        total = sum(timings.values()) * 1000
+        self.stdout.write(self.style.SUCCESS(f'Compiled {len(timings)} templates in {total:.1f} ms.'))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_tag_usage(apps, schema_editor):
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TagUsage = apps.get_model('blog', 'TagUsage')
+    db_alias = schema_editor.connection.alias
+    counts = (
+        TaggedItem.objects.using(db_alias)
+        .filter(content_type__app_label='blog', content_type__model='post')
+        .values('tag_id').annotate(total=Count('pk')).order_by()
+    )
+    TagUsage.objects.using(db_alias).bulk_create(
+        TagUsage(tag_id=row['tag_id'], post_count=row['total']) for row in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_hot_path_indexes'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='taggit.tag')),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-post_count'], name='blog_tagusage_count_idx')],
+            },
+        ),
+        migrations.RunPython(populate_tag_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:49
+
+from itertools import islice
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def log_existing_posts(apps, schema_editor):
+    # Every existing post starts in the log, so a sync from scratch sees them all
+    Post = apps.get_model('blog', 'Post')
+    PostChange = apps.get_model('blog', 'PostChange')
+    db_alias = schema_editor.connection.alias
+    now = timezone.now()
+    post_ids = Post.objects.using(db_alias).order_by('pk').values_list('pk', flat=True).iterator(chunk_size=10000)
+    while batch := list(islice(post_ids, 10000)):
+        PostChange.objects.using(db_alias).bulk_create(
+            [PostChange(post_id=post_id, changed_at=now) for post_id in batch]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_tagusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.IntegerField(unique=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(log_existing_posts, migrations.RunPython.noop),
+    ]
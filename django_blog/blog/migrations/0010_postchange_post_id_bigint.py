@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_postchange'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postchange',
+            name='post_id',
+            field=models.BigIntegerField(unique=True),
+        ),
+    ]
@@ -1,16 +1,63 @@
 # blog/models.py
 
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
+from taggit.managers import TaggableManager
+from taggit.models import Tag
+
+
+def prefetch_tags(posts):
+    """
+    Load the tags of an already fetched list of posts in a single query and
+    attach them, so ``post.tags.all`` in templates doesn't query per post.
+    Posts whose tags are already loaded are skipped.
+    """
+    pending = [
+        post for post in posts
+        if 'tags' not in getattr(post, '_prefetched_objects_cache', {})
+    ]
+    if pending:
+        models.prefetch_related_objects(pending, 'tags')
+    return posts
+
+
+class PostQuerySet(models.QuerySet):
+    def with_tags(self):
+        # Tags for every post in the result, fetched in one extra query
+        return self.prefetch_related('tags')
+
+    def for_listing(self):
+        # Loads everything a feed row renders (author, tags) in a fixed number
+        # of queries, independent of the page size. Comment totals come from
+        # the stored comment_count column.
+        return self.select_related('author').with_tags()
+
 
-# Existing Post Model (Ensure this is still present)
 class Post(models.Model):
     title = models.CharField(max_length=100)
     content = models.TextField()
     published_date = models.DateTimeField(default=timezone.now)
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Last change to the post, its tags or its comments (see blog/signals.py);
+    # used as the HTTP validator for pages showing the post
+    updated_at = models.DateTimeField(auto_now=True)
+    # Covered by the (author, published_date) index below
+    author = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    tags = TaggableManager()
+    # Denormalised number of comments, kept in step by the comment views
+    # (see blog.views) and rebuilt by `manage.py rebuild_comment_counts`
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Feeds are read newest first and paged on (published_date, id)
+            models.Index(fields=['-published_date', '-id'], name='blog_post_published_id_idx'),
+            # Per-author listings
+            models.Index(fields=['author', 'published_date'], name='blog_post_author_pub_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -19,45 +66,87 @@ class Post(models.Model):
         # Used by CreateView/UpdateView to redirect after success
         return reverse('post-detail', kwargs={'pk': self.pk})
 
-# NEW COMMENT MODEL
+    @classmethod
+    def touch(cls, post_id):
+        # Mark a post as changed without re-saving it (no signals fired)
+        cls.objects.filter(pk=post_id).update(updated_at=timezone.now())
+        PostChange.record([post_id])
+
+
 class Comment(models.Model):
-    # Foreign Key to the Post it belongs to
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
-    
+    # Foreign Key to the Post it belongs to (covered by the (post, created_at) index)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments', db_index=False)
+
     # Foreign Key to the User who wrote the comment
     author = models.ForeignKey(User, on_delete=models.CASCADE)
-    
+
     # The actual text content
     content = models.TextField()
-    
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
     class Meta:
         ordering = ['created_at'] # Display newest comments last
         verbose_name_plural = "Comments"
+        indexes = [
+            # Comments are always read per post, oldest first, in keyset pages
+            models.Index(fields=['post', 'created_at'], name='blog_comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
-    
+
     def get_absolute_url(self):
         # Redirect back to the post detail page after a successful action (edit/delete)
         return reverse('post-detail', kwargs={'pk': self.post.pk})
-# blog/models.py
 
-from django.db import models
-from django.contrib.auth.models import User
-from django.utils import timezone
-from django.urls import reverse
-from taggit.managers import TaggableManager # <-- ADD THIS IMPORT
 
-# Existing Post Model
-class Post(models.Model):
-    title = models.CharField(max_length=100)
-    content = models.TextField()
-    published_date = models.DateTimeField(default=timezone.now)
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
-    tags = TaggableManager() # <-- ADD THIS FIELD
+class TagUsage(models.Model):
+    """
+    Materialised number of posts per tag, so popular tags are a short index
+    scan instead of a GROUP BY over every tagged item. Maintained
+    incrementally from tag changes (see blog/tags.py and blog/signals.py).
+    """
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='usage')
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-post_count'], name='blog_tagusage_count_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tag.name}: {self.post_count}'
+
+
+class PostChange(models.Model):
+    """
+    Change log behind the sync feed (see blog/changes.py). Holds one row per
+    post that has ever existed: every change deletes the post's row and
+    inserts a new one, so the auto-increment id (never reused: SQLite
+    tables get AUTOINCREMENT) orders the changes and the table stays as
+    small as the set of posts. Deleted posts keep a tombstone row.
+    """
+    # Not a foreign key: tombstones outlive their posts
+    post_id = models.BigIntegerField(unique=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.pk}: post {self.post_id}{" deleted" if self.deleted else ""}'
 
-    # ... rest of Post model
+    @classmethod
+    def record(cls, post_ids, deleted=False):
+        """Log a change (or the deletion) of each of ``post_ids``."""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        db = router.db_for_write(cls)
+        changed_at = timezone.now()
+        with transaction.atomic(using=db):
+            cls.objects.using(db).filter(post_id__in=post_ids).delete()
+            cls.objects.using(db).bulk_create(
+                [cls(post_id=post_id, deleted=deleted, changed_at=changed_at) for post_id in post_ids]
+            )
@@ -0,0 +1,122 @@
+# blog/pagination.py
+
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Http404):
+    pass
+
+
+def encode_cursor(obj, field='published_date', reverse=False):
+    # Opaque token pointing at a (field, id) position in an ordered listing
+    payload = [getattr(obj, field).isoformat(), obj.pk, int(reverse)]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk, reverse = json.loads(raw)
+        return datetime.fromisoformat(value), int(pk), bool(reverse)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor.')
+
+
+class CursorPage:
+    """A page of a keyset-paginated listing, duck-typed after Django's ``Page``."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset pagination over ``(field, id)``, newest first by default.
+
+    Every page is a single indexed range scan of ``per_page + 1`` rows, so
+    there is no COUNT(*) and deep pages cost the same as the first one.
+    """
+
+    def __init__(self, queryset, per_page, field='published_date', descending=True):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+        self.descending = descending
+
+    def _after(self, value, pk, descending):
+        # Rows strictly after (value, pk) in the given direction. The leading
+        # non-strict bound lets the database seek the (field, id) index
+        # instead of scanning it, which a bare OR would force.
+        op = 'lt' if descending else 'gt'
+        return Q(**{f'{self.field}__{op}e': value}) & (
+            Q(**{f'{self.field}__{op}': value}) | Q(**{f'pk__{op}': pk})
+        )
+
+    def _ordering(self, descending):
+        prefix = '-' if descending else ''
+        return (f'{prefix}{self.field}', f'{prefix}pk')
+
+    def get_page_queryset(self, token=None):
+        """The query for the page at ``token`` (one extra row to detect more)."""
+        queryset = self.queryset
+        reverse = False
+        if token:
+            value, pk, reverse = decode_cursor(token)
+            # A reverse cursor walks back towards the start of the listing
+            queryset = queryset.filter(self._after(value, pk, self.descending != reverse))
+
+        queryset = queryset.order_by(*self._ordering(self.descending != reverse))
+        return queryset[:self.per_page + 1]
+
+    def page(self, token=None):
+        return self._build_page(list(self.get_page_queryset(token)), token)
+
+    async def apage(self, token=None):
+        rows = [row async for row in self.get_page_queryset(token)]
+        return self._build_page(rows, token)
+
+    def _build_page(self, rows, token):
+        reverse = decode_cursor(token)[2] if token else False
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows)
+
+        # Walking forwards, a previous page exists whenever we came from a cursor;
+        # walking backwards, the page we came from is always the next one.
+        has_next = has_more if not reverse else True
+        has_previous = bool(token) if not reverse else has_more
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], self.field) if has_next else None,
+            previous_cursor=encode_cursor(rows[0], self.field, reverse=True) if has_previous else None,
+        )
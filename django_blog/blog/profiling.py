@@ -0,0 +1,150 @@
+# blog/profiling.py
+
+"""
+Opt-in per-request profiling (``BLOG_PROFILING = True``).
+
+``ProfilingMiddleware`` records, for every request, the number of SQL
+queries, total database time, template render time and the slowest
+statement. It reports them in a ``Server-Timing`` header, which browser dev
+tools display, and keeps a rolling window of samples per URL name that
+``profile_summary()`` (and the staff-only ``profiling-summary`` view) turns
+into a hot-endpoint table.
+
+Queries are timed with ``connection.execute_wrapper()``, so this works with
+``DEBUG = False``.
+"""
+
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+_current = ContextVar('blog_request_profile', default=None)
+
+# Requests that matched no URL pattern (404s, probes) share one entry rather
+# than growing the table by one per distinct path
+UNRESOLVED = '<unresolved>'
+
+_samples_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=getattr(settings, 'BLOG_PROFILING_WINDOW', 500)))
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.slowest_sql = ''
+        self.slowest_sql_time = 0.0
+        self.template_depth = 0
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if duration > self.slowest_sql_time:
+            self.slowest_sql, self.slowest_sql_time = sql, duration
+
+
+def _query_timer(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(sql, time.perf_counter() - started)
+
+
+_original_template_render = Template.render
+
+
+def _timed_template_render(self, context):
+    profile = _current.get()
+    if profile is None:
+        return _original_template_render(self, context)
+    # Included templates render inside their parent; only time the outermost
+    profile.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        profile.template_depth -= 1
+        if profile.template_depth == 0:
+            profile.template_time += time.perf_counter() - started
+
+
+def server_timing(profile, total):
+    return ', '.join([
+        f'db;dur={profile.db_time * 1000:.2f};desc="{profile.queries} queries"',
+        f'sql-max;dur={profile.slowest_sql_time * 1000:.2f};desc="slowest query"',
+        f'tpl;dur={profile.template_time * 1000:.2f};desc="templates"',
+        f'total;dur={total * 1000:.2f}',
+    ])
+
+
+def record_sample(url_name, profile, total):
+    with _samples_lock:
+        _samples[url_name].append((total, profile.queries, profile.db_time, profile.template_time,
+                                   profile.slowest_sql_time, profile.slowest_sql))
+
+
+def profile_summary():
+    """Aggregate of the recent requests per URL name, slowest endpoints first."""
+    with _samples_lock:
+        snapshot = {name: list(samples) for name, samples in _samples.items()}
+
+    summary = []
+    for name, samples in snapshot.items():
+        totals = [sample[0] for sample in samples]
+        slowest = max(samples, key=lambda sample: sample[4])
+        summary.append({
+            'url_name': name,
+            'requests': len(samples),
+            'avg_ms': round(statistics.fmean(totals) * 1000, 2),
+            'p95_ms': round(sorted(totals)[int(0.95 * (len(totals) - 1))] * 1000, 2),
+            'avg_queries': round(statistics.fmean(sample[1] for sample in samples), 1),
+            'avg_db_ms': round(statistics.fmean(sample[2] for sample in samples) * 1000, 2),
+            'avg_template_ms': round(statistics.fmean(sample[3] for sample in samples) * 1000, 2),
+            'slowest_sql_ms': round(slowest[4] * 1000, 2),
+            'slowest_sql': slowest[5],
+        })
+    return sorted(summary, key=lambda row: row['avg_ms'] * row['requests'], reverse=True)
+
+
+def reset_profile_samples():
+    with _samples_lock:
+        _samples.clear()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'BLOG_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        Template.render = _timed_template_render
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_query_timer))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = server_timing(profile, total)
+        match = getattr(request, 'resolver_match', None)
+        record_sample(match.view_name if match else UNRESOLVED, profile, total)
+        return response
@@ -0,0 +1,133 @@
+# blog/routers.py
+
+"""
+Read-replica routing for the blog's read-only pages.
+
+``ReplicaRouter`` sends reads to one of the aliases in
+``BLOG_READ_REPLICAS``, but only while a request is being served by a view
+marked with ``read_from_replica`` (the feeds, post detail and search) and
+only for safe methods. Everything else, including every write, sessions,
+auth and management commands, is left to Django's default routing, which
+means the primary (``default``).
+
+Replicas lag behind the primary, so a session that has just written is
+*pinned* to the primary for ``BLOG_REPLICA_PIN_SECONDS``: authors see their
+own new post or comment straight away. ``ReplicaRoutingMiddleware`` keeps
+track of both, and must come after ``SessionMiddleware``; it serves sync and
+async requests alike, and drops out of the stack when no replica is
+configured.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+PRIMARY = 'default'
+PIN_SESSION_KEY = 'blog_primary_until'
+
+_routing = ContextVar('blog_replica_routing', default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, 'BLOG_READ_REPLICAS', []))
+
+
+def read_from_replica(view):
+    """Mark a view (function or class-based) as safe to serve from a replica."""
+    view.read_from_replica = True
+    return view
+
+
+class RequestRouting:
+    """What the router may do for the current request."""
+
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        replicas = get_replicas()
+        if routing is None or not routing.use_replica or not replicas:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            # Reads later in this request must see what was just written
+            routing.wrote = True
+            routing.use_replica = False
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in get_replicas():
+            # Never write back to a replica an object happened to be read from
+            return PRIMARY
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        pool = {PRIMARY, *get_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+def _view_reads_from_replica(view_func):
+    view_class = getattr(view_func, 'view_class', None)
+    return getattr(view_func, 'read_from_replica', False) or getattr(view_class, 'read_from_replica', False)
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = RequestRouting()
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self.pin_after_write(request, routing)
+        return response
+
+    async def __acall__(self, request):
+        routing = RequestRouting()
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self.pin_after_write(request, routing)
+        return response
+
+    def pin_after_write(self, request, routing):
+        if routing.wrote:
+            pin_seconds = getattr(settings, 'BLOG_REPLICA_PIN_SECONDS', 5)
+            request.session[PIN_SESSION_KEY] = time.time() + pin_seconds
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        if routing is None:
+            return None
+        routing.use_replica = (
+            request.method in ('GET', 'HEAD')
+            and _view_reads_from_replica(view_func)
+            and request.session.get(PIN_SESSION_KEY, 0) < time.time()
+        )
+        return None
@@ -0,0 +1,164 @@
+# blog/search.py
+
+"""
+Full-text search over posts backed by an SQLite FTS5 inverted index.
+
+The ``blog_post_fts`` table (created in migration 0003) mirrors each post's
+title, content and tag names under the post's id, and is kept in sync by the
+signal handlers in ``blog/signals.py``. Matches are ranked with BM25; only the
+ids for the requested page are read, so the cost of a search depends on the
+page size rather than on the number of posts.
+
+Other database backends fall back to ``icontains`` filtering.
+"""
+
+import hashlib
+import re
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection, connections, router
+from django.db.models import Q
+
+FTS_TABLE = 'blog_post_fts'
+
+# BM25 column weights for (title, content, tags)
+RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Totals are counted up to this many matches and reported as "more than" beyond it
+MATCH_COUNT_CAP = 1000
+MATCH_COUNT_TIMEOUT = 60
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def read_connection():
+    # Searches follow the database router like ORM reads (e.g. to a replica)
+    from .models import Post
+
+    return connections[router.db_for_read(Post)]
+
+
+def build_match_expression(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word must match; the last one is treated as a prefix so results
+    keep up while the user is still typing.
+    """
+    tokens = TOKEN_RE.findall((query or '').lower())
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_post(post):
+    if not fts_enabled():
+        return
+    tags = ' '.join(post.tags.names()) if post.pk else ''
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+            [post.pk, post.title, post.content, tags],
+        )
+
+
+def bulk_index(entries):
+    """Index many posts at once from ``(id, title, content, tag_names)`` tuples."""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+            [(pk, title, content, ' '.join(tags)) for pk, title, content, tags in entries],
+        )
+
+
+def remove_post(post_id):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def search_post_ids(query, limit, offset=0):
+    """Return the ids of matching posts, best match first, for one page."""
+    if fts_enabled():
+        expression = build_match_expression(query)
+        if expression is None:
+            return []
+        weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+        with read_connection().cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s',
+                [expression, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    from .models import Post
+
+    queryset = Post.objects.filter(
+        Q(title__icontains=query) | Q(content__icontains=query) | Q(tags__name__icontains=query)
+    ).distinct().order_by('-published_date')
+    return list(queryset.values_list('pk', flat=True)[offset:offset + limit])
+
+
+def count_matches(query, cap=MATCH_COUNT_CAP):
+    """
+    Return the number of matching posts, counting at most ``cap + 1`` rows.
+
+    A result above ``cap`` means "more than cap". Counts are cached briefly
+    per normalised query, so paging through results does not recount.
+    """
+    expression = build_match_expression(query)
+    if expression is None:
+        return 0
+    digest = hashlib.md5(f'{cap}:{expression}'.encode()).hexdigest()
+    cache_key = f'blog:search-count:{digest}'
+    total = cache.get(cache_key)
+    if total is not None:
+        return total
+
+    if fts_enabled():
+        with read_connection().cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s LIMIT %s)',
+                [expression, cap + 1],
+            )
+            total = cursor.fetchone()[0]
+    else:
+        total = len(search_post_ids(query, cap + 1))
+
+    cache.set(cache_key, total, MATCH_COUNT_TIMEOUT)
+    return total
+
+
+def search_posts(query, limit, offset=0):
+    """Return the ranked posts for one page, ready for list rendering."""
+    from .models import Post, prefetch_tags
+
+    ids = search_post_ids(query, limit, offset)
+    posts = Post.objects.filter(pk__in=ids).select_related('author').in_bulk()
+    # Tags are attached after trimming to the ranked page
+    return prefetch_tags([posts[pk] for pk in ids if pk in posts])
+
+
+async def asearch_posts(query, limit, offset=0):
+    """``search_posts()`` for async views; the raw FTS lookup runs in a thread."""
+    from .models import Post
+
+    ids = await sync_to_async(search_post_ids)(query, limit, offset)
+    posts = {post.pk: post async for post in Post.objects.filter(pk__in=ids).for_listing()}
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+acount_matches = sync_to_async(count_matches)
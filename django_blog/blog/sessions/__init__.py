@@ -0,0 +1,56 @@
+# blog/sessions/__init__.py
+
+"""
+Session engines for the fast session profile (``BLOG_SESSION_PROFILE``).
+
+``blog.sessions.cached_db`` reads sessions from the cache and only falls
+back to the database on a miss; ``blog.sessions.cache`` keeps them in the
+cache alone. Both skip saves that would not change anything: Django saves a
+session whenever it is marked modified (even with the same values) and, with
+``SESSION_SAVE_EVERY_REQUEST``, on every request just to push its expiry
+back. Here a session whose data is what was loaded is only re-saved for its
+expiry once ``BLOG_SESSION_REFRESH_INTERVAL`` seconds have passed since the
+last save, so a logged-in reader browsing the feed causes no session writes
+at all.
+"""
+
+import time
+
+from django.conf import settings
+
+# Session key holding the time of the last save, for throttled expiry refreshes
+REFRESHED_KEY = '_blog_session_saved'
+
+
+class SkipUnchangedSaveMixin:
+    """For ``SessionStore`` classes: don't save sessions that haven't changed."""
+
+    _loaded_state = None
+
+    def _state(self, data):
+        # The serialised data, minus the refresh timestamp
+        return self.serializer().dumps({key: value for key, value in data.items() if key != REFRESHED_KEY})
+
+    def load(self):
+        data = super().load()
+        self._loaded_state = self._state(data)
+        return data
+
+    def _refresh_due(self):
+        if not settings.SESSION_SAVE_EVERY_REQUEST:
+            return False
+        interval = getattr(settings, 'BLOG_SESSION_REFRESH_INTERVAL', 300)
+        return time.time() - self._session.get(REFRESHED_KEY, 0) >= interval
+
+    def save(self, must_create=False):
+        if (
+            not must_create
+            and self._loaded_state is not None
+            and self._state(self._session) == self._loaded_state
+            and not self._refresh_due()
+        ):
+            return
+        if settings.SESSION_SAVE_EVERY_REQUEST:
+            self._session[REFRESHED_KEY] = int(time.time())
+        super().save(must_create)
+        self._loaded_state = self._state(self._session)
@@ -0,0 +1,9 @@
+# blog/sessions/cache.py
+
+from django.contrib.sessions.backends import cache
+
+from . import SkipUnchangedSaveMixin
+
+
+class SessionStore(SkipUnchangedSaveMixin, cache.SessionStore):
+    """Sessions in the cache only (``SESSION_CACHE_ALIAS``); unchanged ones aren't re-saved."""
@@ -0,0 +1,9 @@
+# blog/sessions/cached_db.py
+
+from django.contrib.sessions.backends import cached_db
+
+from . import SkipUnchangedSaveMixin
+
+
+class SessionStore(SkipUnchangedSaveMixin, cached_db.SessionStore):
+    """Database sessions read through the cache; unchanged ones aren't re-saved."""
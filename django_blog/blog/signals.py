@@ -0,0 +1,70 @@
+# blog/signals.py
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import caching, search
+from .models import Comment, Post, PostChange
+from .tags import adjust_tag_counts
+
+
+def tag_slugs(post_id):
+    return list(Post(pk=post_id).tags.slugs())
+
+
+def tag_ids(post_id):
+    return list(Post(pk=post_id).tags.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, **kwargs):
+    # Fixture loading (raw) is left to the migration/backfill
+    if not raw:
+        search.index_post(instance)
+    caching.invalidate(*caching.post_scopes(instance.pk, tag_slugs(instance.pk)))
+    PostChange.record([instance.pk])
+
+
+@receiver(pre_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    # Tags are removed along with the post, so collect them beforehand
+    caching.invalidate(*caching.post_scopes(instance.pk, tag_slugs(instance.pk)))
+    adjust_tag_counts({tag_id: -1 for tag_id in tag_ids(instance.pk)})
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+    PostChange.record([instance.pk], deleted=True)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_post_tags(sender, instance, action, model, pk_set, **kwargs):
+    if not isinstance(instance, Post):
+        return
+    if action == 'pre_clear':
+        caching.invalidate(*caching.post_scopes(instance.pk, tag_slugs(instance.pk)))
+        adjust_tag_counts({tag_id: -1 for tag_id in tag_ids(instance.pk)})
+    elif action in ('post_add', 'post_remove') and pk_set:
+        # The post's other tag feeds list its tags too, so they change as well
+        changed = model.objects.filter(pk__in=pk_set).values_list('slug', flat=True)
+        slugs = {*tag_slugs(instance.pk), *changed}
+        caching.invalidate(*caching.post_scopes(instance.pk, slugs))
+        delta = 1 if action == 'post_add' else -1
+        adjust_tag_counts({tag_id: delta for tag_id in pk_set})
+
+    # Tags are saved after the post itself (form.save_m2m), so refresh the entry
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        search.index_post(instance)
+        Post.touch(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post(sender, instance, origin=None, **kwargs):
+    # Comments deleted along with their post: the post's handlers cover it once
+    if isinstance(origin, Post) or getattr(origin, 'model', None) is Post:
+        return
+    # Comment totals appear on every page that shows the post
+    caching.invalidate(*caching.post_scopes(instance.post_id, tag_slugs(instance.post_id)))
+    Post.touch(instance.post_id)
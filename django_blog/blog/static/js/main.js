@@ -7,3 +7,18 @@ document.addEventListener('DOMContentLoaded', (event) => {
     // Example: Add a class to the header for testing linkage
     document.querySelector('header').classList.add('js-loaded');
 })
+
+// Load further pages of comments in place instead of reloading the post
+document.addEventListener('click', (event) => {
+    const link = event.target.closest('.load-more-comments');
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+    fetch(link.dataset.fragmentUrl)
+        .then((response) => response.text())
+        .then((html) => {
+            link.insertAdjacentHTML('afterend', html);
+            link.remove();
+        });
+});
@@ -0,0 +1,86 @@
+# blog/tags.py
+
+"""
+Tag usage counts backed by the materialised ``TagUsage`` table.
+
+``adjust_tag_counts()`` applies +/- deltas as tags are added to or removed
+from posts; ``top_tags()`` reads the N most used tags straight off the
+``post_count`` index, and ``popular_tags()`` caches that list until the
+counts change.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, F
+from taggit.models import TaggedItem
+
+from . import caching
+from .models import Post, TagUsage
+
+TAG_CLOUD_SCOPE = 'tag-cloud'
+
+
+def adjust_tag_counts(deltas):
+    """Apply ``{tag_id: delta}`` changes to the stored counts."""
+    deltas = {tag_id: delta for tag_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        TagUsage.objects.bulk_create(
+            [TagUsage(tag_id=tag_id) for tag_id in deltas], ignore_conflicts=True
+        )
+        # One UPDATE per distinct delta (usually just +1 or -1)
+        groups = {}
+        for tag_id, delta in deltas.items():
+            groups.setdefault(delta, []).append(tag_id)
+        for delta, tag_ids in groups.items():
+            TagUsage.objects.filter(tag_id__in=tag_ids).update(post_count=F('post_count') + delta)
+    caching.invalidate(TAG_CLOUD_SCOPE)
+
+
+def _top_usages(limit):
+    return (
+        TagUsage.objects.filter(post_count__gt=0)
+        .select_related('tag').order_by('-post_count', 'tag_id')[:limit]
+    )
+
+
+def top_tags(limit=20):
+    """The ``limit`` most used tags as ``(tag, post_count)`` pairs."""
+    return [(usage.tag, usage.post_count) for usage in _top_usages(limit)]
+
+
+def popular_tags(limit=20):
+    """``top_tags()``, cached until a tag count changes."""
+    cache = caching.get_cache()
+    key = f"blog:tag-cloud:{caching.get_versions([TAG_CLOUD_SCOPE])[0]}:{limit}"
+    tags = cache.get(key)
+    if tags is None:
+        tags = top_tags(limit)
+        cache.set(key, tags, caching.get_timeout())
+    return tags
+
+
+async def apopular_tags(limit=20):
+    """``popular_tags()`` for async views."""
+    cache = caching.get_cache()
+    key = f"blog:tag-cloud:{(await caching.aget_versions([TAG_CLOUD_SCOPE]))[0]}:{limit}"
+    tags = await cache.aget(key)
+    if tags is None:
+        tags = [(usage.tag, usage.post_count) async for usage in _top_usages(limit)]
+        await cache.aset(key, tags, caching.get_timeout())
+    return tags
+
+
+def rebuild_tag_counts():
+    """Recompute every count from the tagged items (one GROUP BY)."""
+    counts = (
+        TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Post))
+        .values('tag_id').annotate(total=Count('pk')).order_by()
+    )
+    with transaction.atomic():
+        TagUsage.objects.all().delete()
+        TagUsage.objects.bulk_create(
+            TagUsage(tag_id=row['tag_id'], post_count=row['total']) for row in counts.iterator()
+        )
+    caching.invalidate(TAG_CLOUD_SCOPE)
@@ -0,0 +1,63 @@
+# blog/template_cache.py
+
+"""
+Warming the template cache so no request pays for parsing.
+
+With the cached loader (the default, and explicit in the production profile
+in settings) each template is read and compiled once per process, on first
+use. ``warm_templates()`` does that for every template the project ships
+before the first request: ``django_blog/wsgi.py`` and ``asgi.py`` call it
+at worker start when ``BLOG_WARM_TEMPLATES`` is on, and
+``manage.py warm_templates`` runs it as a deploy-time check.
+"""
+
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+TEMPLATE_SUFFIXES = ('.html', '.txt', '.xml')
+
+
+def template_names(engine, app_labels=('blog',)):
+    """Names of the templates in the engine's DIRS and the given apps."""
+    directories = [Path(directory) for directory in engine.dirs]
+    directories += [Path(apps.get_app_config(label).path) / 'templates' for label in app_labels]
+    names = set()
+    for directory in directories:
+        if directory.is_dir():
+            names.update(
+                path.relative_to(directory).as_posix()
+                for path in directory.rglob('*')
+                if path.suffix in TEMPLATE_SUFFIXES
+            )
+    return sorted(names)
+
+
+def warm_templates(app_labels=('blog',)):
+    """
+    Load (and so parse and cache) every template; returns ``(timings, errors)``
+    as ``{name: seconds}`` and ``{name: message}``.
+    """
+    timings = {}
+    errors = {}
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine, app_labels):
+            started = time.perf_counter()
+            try:
+                backend.engine.get_template(name)
+            except TemplateSyntaxError as exc:
+                errors[name] = str(exc)
+            else:
+                timings[name] = time.perf_counter() - started
+    return timings, errors
+
+
+def warm_templates_on_startup():
+    if getattr(settings, 'BLOG_WARM_TEMPLATES', False):
+        warm_templates()
@@ -1,3 +1,1447 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import warnings
+import time
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Comment, Post, PostChange
+
+class BlogTestCase(TestCase):
+    """Starts every test with an empty cache so rendered pages don't leak between tests."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+class PostListQueryTests(BlogTestCase):
+    """The feed must render in a fixed number of queries, whatever the page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}', password='pass12345')
+            for i in range(3)
+        ]
+        for i in range(12):
+            post = Post.objects.create(
+                title=f'Post {i}',
+                content='Body',
+                author=cls.authors[i % 3],
+            )
+            post.tags.add('django', f'tag{i}')
+            for j in range(i % 4):
+                Comment.objects.create(post=post, author=cls.authors[j % 3], content='Hi')
+        call_command('rebuild_comment_counts', stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        # The popular-tags sidebar is cached on its own; warm it so only the
+        # per-page queries are counted
+        from .tags import popular_tags
+        from .views import POPULAR_TAGS_LIMIT
+        popular_tags(POPULAR_TAGS_LIMIT)
+
+    def test_cold_tag_cloud_costs_one_query(self):
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.client.get(reverse('blog-home'))
+
+    def test_home_feed_query_count(self):
+        # 1 narrow ETag query, 1 page of posts (+author), 1 tags prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('blog-home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['posts']), 5)
+
+    def test_query_count_independent_of_page_size(self):
+        from .views import PostListView
+
+        original = PostListView.paginate_by
+        try:
+            PostListView.paginate_by = 12
+            with self.assertNumQueries(3):
+                self.client.get(reverse('blog-home'))
+        finally:
+            PostListView.paginate_by = original
+
+    @override_settings(BLOG_FEED_PAGINATION='offset')
+    def test_offset_mode_query_count(self):
+        # Offset pagination adds the paginator's COUNT(*)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('blog-home'))
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 3)
+
+    def test_tag_feed_query_count(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('posts-by-tag', kwargs={'tag_slug': 'django'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '#django')
+
+    def test_comment_counts_are_shown(self):
+        response = self.client.get(reverse('blog-home'))
+        counts = {post.title: post.comment_count for post in response.context['posts']}
+        self.assertEqual(counts['Post 11'], 3)
+        self.assertEqual(counts['Post 8'], 0)
+
+
+@override_settings(BLOG_FEED_PAGINATION='cursor')
+class CursorPaginationTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        author = User.objects.create_user(username='writer', password='pass12345')
+        now = timezone.now()
+        # Pairs of posts share a timestamp so the id tie-breaker is exercised
+        for i in range(11):
+            post = Post.objects.create(
+                title=f'Post {i}',
+                content='Body',
+                author=author,
+                published_date=now - timedelta(minutes=i // 2),
+            )
+            if i % 2:
+                post.tags.add('odd')
+        cls.expected = list(
+            Post.objects.order_by('-published_date', '-pk').values_list('title', flat=True)
+        )
+
+    def walk(self, url):
+        titles, cursor, pages = [], None, 0
+        while True:
+            response = self.client.get(url, {'cursor': cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            titles += [post.title for post in response.context['posts']]
+            pages += 1
+            cursor = response.context['next_cursor']
+            if not cursor:
+                return titles, pages, response
+
+    def test_walks_every_post_once_in_order(self):
+        titles, pages, last = self.walk(reverse('blog-home'))
+        self.assertEqual(titles, self.expected)
+        self.assertEqual(pages, 3)
+        self.assertIsNotNone(last.context['prev_cursor'])
+
+    def test_previous_cursor_returns_preceding_page(self):
+        first = self.client.get(reverse('blog-home'))
+        second = self.client.get(reverse('blog-home'), {'cursor': first.context['next_cursor']})
+        back = self.client.get(reverse('blog-home'), {'cursor': second.context['prev_cursor']})
+        self.assertEqual(
+            [p.title for p in back.context['posts']],
+            [p.title for p in first.context['posts']],
+        )
+        self.assertIsNone(back.context['prev_cursor'])
+        self.assertIsNotNone(back.context['next_cursor'])
+
+    def test_deep_page_has_no_count_query(self):
+        first = self.client.get(reverse('blog-home'))
+        second = self.client.get(reverse('blog-home'), {'cursor': first.context['next_cursor']})
+        with self.assertNumQueries(3):
+            self.client.get(reverse('blog-home'), {'cursor': second.context['next_cursor']})
+
+    def test_tag_feed_is_cursor_paginated(self):
+        titles, pages, _ = self.walk(reverse('posts-by-tag', kwargs={'tag_slug': 'odd'}))
+        self.assertEqual(titles, [t for t in self.expected if int(t.split()[1]) % 2])
+        self.assertEqual(pages, 1)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('blog-home'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class PostSearchTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='searcher', password='pass12345')
+        cls.title_hit = Post.objects.create(
+            title='Caching strategies', content='A post about layers.', author=cls.author
+        )
+        cls.body_hit = Post.objects.create(
+            title='Notes', content='We talk about caching once.', author=cls.author
+        )
+        cls.tag_hit = Post.objects.create(title='Misc', content='Nothing here.', author=cls.author)
+        cls.tag_hit.tags.add('performance')
+        Post.objects.create(title='Unrelated', content='Gardening tips.', author=cls.author)
+
+    def search(self, query, **params):
+        return self.client.get(reverse('post-search'), {'q': query, **params})
+
+    def test_ranks_title_matches_first(self):
+        response = self.search('caching')
+        self.assertEqual(
+            [post.pk for post in response.context['posts']],
+            [self.title_hit.pk, self.body_hit.pk],
+        )
+
+    def test_prefix_and_tag_matches(self):
+        response = self.search('perf')
+        self.assertEqual([post.pk for post in response.context['posts']], [self.tag_hit.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.body_hit.title = 'Gardening journal'
+        self.body_hit.content = 'Roses.'
+        self.body_hit.save()
+        self.assertEqual([p.pk for p in self.search('caching').context['posts']], [self.title_hit.pk])
+
+        self.title_hit.delete()
+        self.assertEqual(list(self.search('caching').context['posts']), [])
+
+        self.tag_hit.tags.clear()
+        self.assertEqual(list(self.search('performance').context['posts']), [])
+
+    def test_results_are_paginated(self):
+        for i in range(12):
+            Post.objects.create(title=f'Paged {i}', content='pagination', author=self.author)
+        first = self.search('pagination')
+        self.assertEqual(len(first.context['posts']), 10)
+        self.assertTrue(first.context['has_next'])
+        second = self.search('pagination', page=2)
+        self.assertEqual(len(second.context['posts']), 2)
+        self.assertFalse(second.context['has_next'])
+
+    def test_punctuation_only_query_returns_nothing(self):
+        response = self.search('"*)(')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['posts']), [])
+
+
+class BoundedSearchTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='bulk', password='pass12345')
+        Post.objects.bulk_create(
+            Post(title=f'Broad {i}', content='common word', author=author) for i in range(30)
+        )
+        # bulk_create skips signals; index the rows directly
+        from .search import index_post
+        for post in Post.objects.all():
+            index_post(post)
+
+    def test_total_is_capped(self):
+        from unittest import mock
+
+        with mock.patch('blog.views.MATCH_COUNT_CAP', 20):
+            response = self.client.get(reverse('post-search'), {'q': 'common'})
+        self.assertEqual(response.context['total'], 20)
+        self.assertTrue(response.context['total_capped'])
+        self.assertContains(response, 'more than 20 found')
+
+    def test_count_is_cached_between_pages(self):
+        self.client.get(reverse('post-search'), {'q': 'common'})
+        # Second page: one id query + posts + tags, no recount
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('post-search'), {'q': 'common', 'page': 2})
+        self.assertEqual(response.context['total'], 30)
+        self.assertEqual(len(response.context['posts']), 10)
+
+    def test_page_depth_is_bounded(self):
+        from unittest import mock
+
+        with mock.patch('blog.views.SEARCH_MAX_PAGES', 2):
+            response = self.client.get(reverse('post-search'), {'q': 'common', 'page': 99})
+        self.assertEqual(response.context['page_number'], 2)
+        self.assertFalse(response.context['has_next'])
+
+    def test_last_page_reaches_the_counted_total(self):
+        from .search import MATCH_COUNT_CAP
+        from .views import SEARCH_MAX_PAGES, SEARCH_RESULTS_PER_PAGE
+
+        self.assertEqual(SEARCH_MAX_PAGES * SEARCH_RESULTS_PER_PAGE, MATCH_COUNT_CAP)
+
+
+class CommentCountTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='commenter', password='pass12345')
+        cls.post = Post.objects.create(title='Counted', content='Body', author=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_add_and_delete_keep_counter_in_step(self):
+        url = reverse('add-comment', kwargs={'pk': self.post.pk})
+        self.client.post(url, {'content': 'First'})
+        self.client.post(url, {'content': 'Second'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+        comment = self.post.comments.first()
+        self.client.post(reverse('comment-delete', kwargs={'pk': comment.pk}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_concurrent_deletes_decrement_once(self):
+        url = reverse('add-comment', kwargs={'pk': self.post.pk})
+        self.client.post(url, {'content': 'Twice'})
+        comment = self.post.comments.get()
+        loaded = Comment.objects.get(pk=comment.pk)
+
+        # Another request deletes the comment after this one has loaded it
+        self.client.post(reverse('comment-delete', kwargs={'pk': comment.pk}))
+        with mock.patch('blog.views.CommentDeleteView.get_object', return_value=loaded):
+            response = self.client.post(reverse('comment-delete', kwargs={'pk': comment.pk}))
+        self.assertEqual(response.status_code, 302)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_detail_page_does_not_count_comments(self):
+        Comment.objects.create(post=self.post, author=self.user, content='Hi')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=1)
+        response = self.client.get(reverse('post-detail', kwargs={'pk': self.post.pk}))
+        self.assertContains(response, 'Comments (1)')
+
+    def test_rebuild_command_repairs_drift(self):
+        Comment.objects.create(post=self.post, author=self.user, content='Untracked')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+        out = StringIO()
+        call_command('rebuild_comment_counts', batch_size=1, stdout=out)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertIn('Rebuilt comment counts for 1 posts.', out.getvalue())
+
+    def test_rebuild_command_touches_and_invalidates_corrected_posts_only(self):
+        other = Post.objects.create(title='Correct', content='Body', author=self.user)
+        self.post.tags.add('drift')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=3)
+        stamps = dict(Post.objects.values_list('pk', 'updated_at'))
+
+        with mock.patch('blog.caching.invalidate') as invalidate:
+            call_command('rebuild_comment_counts', stdout=StringIO())
+        invalidate.assert_called_once_with('feed', f'post:{self.post.pk}', 'tag:drift')
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertGreater(self.post.updated_at, stamps[self.post.pk])
+        self.assertEqual(other.updated_at, stamps[other.pk])
+
+    def test_rebuild_command_bumps_cache_versions_on_commit(self):
+        from . import caching
+
+        Post.objects.filter(pk=self.post.pk).update(comment_count=3)
+        with self.captureOnCommitCallbacks() as callbacks:
+            call_command('rebuild_comment_counts', stdout=StringIO())
+        with mock.patch.object(caching, 'bump_versions') as bump:
+            for callback in callbacks:
+                callback()
+        bump.assert_called_once_with(('feed', f'post:{self.post.pk}'))
+
+
+class PostDetailCommentTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'reader{i}', password='pass12345') for i in range(5)
+        ]
+        cls.post = Post.objects.create(title='Popular', content='Body', author=cls.users[0])
+        cls.post.tags.add('busy')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.users[i % 5], content=f'Comment {i}') for i in range(45)
+        )
+
+    def test_detail_renders_first_page_in_fixed_queries(self):
+        # updated_at validator, post + author, tags, one page of comments + authors
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('post-detail', kwargs={'pk': self.post.pk}))
+        self.assertEqual(len(response.context['comments']), 20)
+        self.assertContains(response, 'Load more comments')
+
+    def test_fragment_pages_through_all_comments(self):
+        response = self.client.get(reverse('post-detail', kwargs={'pk': self.post.pk}))
+        seen = [c.content for c in response.context['comments']]
+        cursor = response.context['comments'].next_cursor
+        while cursor:
+            with self.assertNumQueries(2):
+                fragment = self.client.get(
+                    reverse('post-comments', kwargs={'pk': self.post.pk}), {'cursor': cursor}
+                )
+            self.assertNotContains(fragment, '<html')
+            seen += [c.content for c in fragment.context['comments']]
+            cursor = fragment.context['comments'].next_cursor
+        self.assertEqual(seen, [f'Comment {i}' for i in range(45)])
+
+    def test_fragment_for_missing_post_is_404(self):
+        response = self.client.get(reverse('post-comments', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, 404)
+
+
+class PageCacheTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='cached', password='pass12345')
+        cls.post = Post.objects.create(title='Original title', content='Body', author=cls.author)
+        cls.post.tags.add('alpha')
+
+    def setUp(self):
+        super().setUp()
+        from .caching import reset_cache_stats
+        reset_cache_stats()
+
+    def get(self, name, **kwargs):
+        return self.client.get(reverse(name, kwargs=kwargs))
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        from .caching import cache_stats
+
+        self.assertEqual(self.get('blog-home')['X-Blog-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.get('blog-home')
+        self.assertEqual(response['X-Blog-Cache'], 'hit')
+        self.assertContains(response, 'Original title')
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_post_update_invalidates_feed_tag_and_detail(self):
+        pages = [('blog-home', {}), ('posts-by-tag', {'tag_slug': 'alpha'}),
+                 ('post-detail', {'pk': self.post.pk})]
+        for name, kwargs in pages:
+            self.get(name, **kwargs)
+
+        self.client.force_login(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('post-update', kwargs={'pk': self.post.pk}),
+                {'title': 'New title', 'content': 'Body', 'tags': 'alpha'},
+            )
+        self.client.logout()
+
+        for name, kwargs in pages:
+            response = self.get(name, **kwargs)
+            self.assertEqual(response['X-Blog-Cache'], 'miss')
+            self.assertContains(response, 'New title')
+
+    def test_comment_invalidates_only_affected_post(self):
+        other = Post.objects.create(title='Other', content='Body', author=self.author)
+        self.get('post-detail', pk=self.post.pk)
+        self.get('post-detail', pk=other.pk)
+
+        self.client.force_login(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add-comment', kwargs={'pk': self.post.pk}), {'content': 'Hi'})
+        self.client.logout()
+
+        self.assertEqual(self.get('post-detail', pk=self.post.pk)['X-Blog-Cache'], 'miss')
+        self.assertEqual(self.get('post-detail', pk=other.pk)['X-Blog-Cache'], 'hit')
+
+    def test_deleting_a_post_does_not_touch_it_per_comment(self):
+        def delete(comments):
+            post = Post.objects.create(title='Busy', content='Body', author=self.author)
+            post.tags.add('alpha')
+            Comment.objects.bulk_create(
+                [Comment(post=post, author=self.author, content=str(i)) for i in range(comments)]
+            )
+            post_id = post.pk
+            with CaptureQueriesContext(connection) as captured:
+                post.delete()
+            self.assertTrue(PostChange.objects.get(post_id=post_id).deleted)
+            return len(captured)
+
+        self.assertEqual(delete(50), delete(1))
+
+    def test_newly_added_tag_invalidates_its_feed(self):
+        self.get('posts-by-tag', tag_slug='beta')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.add('beta')
+        response = self.get('posts-by-tag', tag_slug='beta')
+        self.assertEqual(response['X-Blog-Cache'], 'miss')
+        self.assertContains(response, 'Original title')
+
+    def test_tag_changes_invalidate_the_posts_other_tag_feeds(self):
+        # Every feed also depends on the tag cloud; check the post's own scopes
+        def invalidated(change):
+            with mock.patch('blog.caching.invalidate') as invalidate:
+                change()
+            return {scope for call in invalidate.call_args_list for scope in call.args}
+
+        self.assertLessEqual({'tag:alpha', 'tag:beta'}, invalidated(lambda: self.post.tags.add('beta')))
+        self.assertLessEqual({'tag:alpha', 'tag:beta'}, invalidated(lambda: self.post.tags.remove('beta')))
+
+    def test_tag_counts_invalidate_the_tag_cloud_on_every_feed(self):
+        other = Post.objects.create(title='Elsewhere', content='Body', author=self.author)
+        self.get('posts-by-tag', tag_slug='alpha')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.tags.add('gamma')
+        response = self.get('posts-by-tag', tag_slug='alpha')
+        self.assertEqual(response['X-Blog-Cache'], 'miss')
+        self.assertContains(response, '#gamma (1)')
+
+    def test_signed_in_users_bypass_cache(self):
+        self.client.force_login(self.author)
+        self.get('blog-home')
+        response = self.get('blog-home')
+        self.assertNotIn('X-Blog-Cache', response)
+
+    def test_works_with_file_based_cache(self):
+        import tempfile
+        from django.core.cache import caches
+
+        with tempfile.TemporaryDirectory() as location:
+            file_cache = {
+                'default': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': location,
+                }
+            }
+            with override_settings(CACHES=file_cache):
+                self.assertEqual(self.get('post-detail', pk=self.post.pk)['X-Blog-Cache'], 'miss')
+                self.assertEqual(self.get('post-detail', pk=self.post.pk)['X-Blog-Cache'], 'hit')
+                caches['default'].clear()
+
+
+class ConditionalGetTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='etag', password='pass12345')
+        cls.post = Post.objects.create(title='Validated', content='Body', author=cls.author)
+        cls.post.tags.add('http')
+
+    def clear_pages(self):
+        # Drop the cached pages but keep the tag cloud's version, which feed ETags include
+        from .caching import _version_key
+        from .tags import TAG_CLOUD_SCOPE
+
+        versions = cache.get_many([_version_key(TAG_CLOUD_SCOPE)])
+        cache.clear()
+        cache.set_many(versions, None)
+
+    def assert_revalidates(self, url):
+        first = self.client.get(url)
+        etag = first['ETag']
+        self.clear_pages()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_feed_detail_and_tag_pages_return_304(self):
+        for url in (reverse('blog-home'),
+                    reverse('posts-by-tag', kwargs={'tag_slug': 'http'}),
+                    reverse('post-detail', kwargs={'pk': self.post.pk})):
+            self.assert_revalidates(url)
+
+    def test_cache_hit_answers_304_without_queries(self):
+        url = reverse('blog-home')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_last_modified(self):
+        url = reverse('post-detail', kwargs={'pk': self.post.pk})
+        last_modified = self.client.get(url)['Last-Modified']
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_and_tag_changes_change_the_etag(self):
+        url = reverse('post-detail', kwargs={'pk': self.post.pk})
+        feed = reverse('blog-home')
+        etag, feed_etag = self.client.get(url)['ETag'], self.client.get(feed)['ETag']
+
+        Comment.objects.create(post=self.post, author=self.author, content='New')
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(self.client.get(feed)['ETag'], feed_etag)
+
+        etag = response['ETag']
+        self.post.tags.add('fresh')
+        cache.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_tag_cloud_changes_change_the_feed_etag(self):
+        url = reverse('posts-by-tag', kwargs={'tag_slug': 'http'})
+        etag = self.client.get(url)['ETag']
+        other = Post.objects.create(title='Elsewhere', content='Body', author=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.tags.add('gamma')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '#gamma (1)')
+
+    def test_signed_in_etag_follows_the_csrf_cookie(self):
+        self.client.force_login(self.author)
+        url = reverse('post-detail', kwargs={'pk': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # The cached page's comment form carries a token for the old cookie
+        del self.client.cookies[settings.CSRF_COOKIE_NAME]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_etag_differs_per_viewer(self):
+        url = reverse('post-detail', kwargs={'pk': self.post.pk})
+        anonymous = self.client.get(url)['ETag']
+        self.client.force_login(self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+
+class IndexPlanTests(BlogTestCase):
+    """The hot feed/comment queries must be answered from the composite indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='planner', password='pass12345')
+        cls.post = Post.objects.create(title='Planned', content='Body', author=cls.author)
+
+    def plan(self, queryset):
+        from django.db import connection
+
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def test_keyset_page_seeks_the_feed_index(self):
+        from .pagination import CursorPaginator, encode_cursor
+
+        queryset = CursorPaginator(Post.objects.all(), 5).get_page_queryset(encode_cursor(self.post))
+        plan = self.plan(queryset)
+        self.assertIn('USING INDEX blog_post_published_id_idx (published_date<?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_author_and_comment_lookups_avoid_sorting(self):
+        by_author = Post.objects.filter(author=self.author).order_by('-published_date')[:5]
+        self.assertIn('blog_post_author_pub_idx', self.plan(by_author))
+        self.assertNotIn('TEMP B-TREE', self.plan(by_author))
+
+        comments = Comment.objects.filter(post=self.post).order_by('created_at')[:20]
+        self.assertIn('blog_comment_post_created_idx', self.plan(comments))
+        self.assertNotIn('TEMP B-TREE', self.plan(comments))
+
+    def test_benchmark_never_overwrites_existing_files(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        existing = Path(directory, 'keep.sqlite3')
+        existing.write_bytes(b'precious')
+        with self.assertRaisesMessage(CommandError, '--force'):
+            call_command('benchmark_indexes', db=str(existing), stdout=StringIO())
+        self.assertEqual(existing.read_bytes(), b'precious')
+
+    def test_benchmark_keeps_only_the_db_it_was_given(self):
+        from django.db import connections
+        from .management.commands import benchmark_indexes
+
+        used = []
+
+        def run(command, options):
+            path = Path(connections.settings[benchmark_indexes.ALIAS]['NAME'])
+            path.write_bytes(b'results')
+            used.append(path)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        given = Path(directory, 'bench.sqlite3')
+        with mock.patch.object(benchmark_indexes.Command, 'run', run):
+            call_command('benchmark_indexes', db=str(given), stdout=StringIO())
+            call_command('benchmark_indexes', stdout=StringIO())
+        self.assertEqual(used[0], given)
+        self.assertEqual(given.read_bytes(), b'results')
+        self.assertFalse(used[1].exists())
+
+
+class SeedBlogCommandTests(BlogTestCase):
+
+    def test_seeds_consistent_data_in_batches(self):
+        from django.db.models import Count, F
+        from taggit.models import TaggedItem
+
+        out = StringIO()
+        call_command(
+            'seed_blog', users=6, posts=40, tags=8, batch_size=15, seed=3,
+            max_comments_per_post=25, stdout=out,
+        )
+        self.assertEqual(User.objects.count(), 6)
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertIn('posts: 15/40', out.getvalue())
+        self.assertIn('Seeded 6 users, 40 posts', out.getvalue())
+
+        # Stored counters match the comments actually created
+        drift = Post.objects.annotate(n=Count('comments')).exclude(n=F('comment_count'))
+        self.assertFalse(drift.exists())
+        self.assertTrue(TaggedItem.objects.exists())
+
+        # Seeded posts are searchable
+        word = Post.objects.first().title.split()[0]
+        response = self.client.get(reverse('post-search'), {'q': word})
+        self.assertTrue(response.context['posts'])
+
+
+class RequestBenchmarkTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_blog', users=4, posts=25, tags=5, seed=7, stdout=StringIO())
+
+    def test_saves_baseline_and_flags_regressions(self):
+        import json
+        import tempfile
+        from django.core.management import CommandError
+
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = f'{directory}/baseline.json'
+            out = StringIO()
+            call_command('benchmark_requests', requests=3, memory_requests=1,
+                         baseline=baseline, save_baseline=True, stdout=out)
+            with open(baseline) as handle:
+                saved = json.load(handle)
+            self.assertEqual(
+                set(saved),
+                {'blog-home', 'blog-home (deep page)', 'post-detail', 'post-search', 'posts-by-tag'},
+            )
+            # ETag, page, tags prefetch and the (uncached) tag cloud
+            self.assertEqual(saved['blog-home']['max_queries'], 4)
+
+            # A baseline that was much faster and used fewer queries must fail the run
+            for result in saved.values():
+                result.update(p50_ms=0.001, p95_ms=0.001, max_queries=1)
+            with open(baseline, 'w') as handle:
+                json.dump(saved, handle)
+            with self.assertRaisesMessage(CommandError, 'Performance regressions'):
+                call_command('benchmark_requests', requests=3, memory_requests=1,
+                             baseline=baseline, stdout=StringIO())
+
+
+class ProfilingMiddlewareTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='profiled', password='pass12345')
+        Post.objects.create(title='Profiled', content='Body', author=author)
+        cls.staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        from .profiling import reset_profile_samples
+        reset_profile_samples()
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('blog-home'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(BLOG_PROFILING=True)
+    def test_server_timing_header_and_summary(self):
+        from .tags import popular_tags
+        from .views import POPULAR_TAGS_LIMIT
+        popular_tags(POPULAR_TAGS_LIMIT)
+
+        response = self.client.get(reverse('blog-home'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="3 queries"', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+        self.client.get(reverse('blog-home'))
+        self.client.force_login(self.staff)
+        summary = self.client.get(reverse('profiling-summary')).json()['endpoints']
+        home = next(row for row in summary if row['url_name'] == 'blog-home')
+        self.assertEqual(home['requests'], 2)
+        self.assertTrue(home['slowest_sql'].startswith('SELECT'))
+
+    @override_settings(BLOG_PROFILING=True)
+    def test_unresolved_paths_share_one_entry(self):
+        from .profiling import UNRESOLVED, profile_summary
+        for i in range(3):
+            self.client.get(f'/no-such-page-{i}/')
+        self.assertEqual(
+            [(row['url_name'], row['requests']) for row in profile_summary()], [(UNRESOLVED, 3)]
+        )
+
+    @override_settings(BLOG_PROFILING=True)
+    def test_summary_is_staff_only(self):
+        response = self.client.get(reverse('profiling-summary'))
+        self.assertEqual(response.status_code, 302)
+
+
+class TagUsageTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='tagger', password='pass12345')
+
+    def counts(self):
+        from .tags import top_tags
+        return {tag.name: count for tag, count in top_tags(10)}
+
+    def test_counts_follow_tag_changes(self):
+        first = Post.objects.create(title='One', content='Body', author=self.author)
+        second = Post.objects.create(title='Two', content='Body', author=self.author)
+        first.tags.add('python', 'django')
+        second.tags.add('python')
+        self.assertEqual(self.counts(), {'python': 2, 'django': 1})
+
+        second.tags.set(['django', 'web'])
+        self.assertEqual(self.counts(), {'python': 1, 'django': 2, 'web': 1})
+
+        first.tags.clear()
+        self.assertEqual(self.counts(), {'django': 1, 'web': 1})
+
+        second.delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_update_view_adjusts_counts(self):
+        post = Post.objects.create(title='Viewed', content='Body', author=self.author)
+        post.tags.add('old')
+        self.client.force_login(self.author)
+        self.client.post(
+            reverse('post-update', kwargs={'pk': post.pk}),
+            {'title': 'Viewed', 'content': 'Body', 'tags': 'new, other'},
+        )
+        self.assertEqual(self.counts(), {'new': 1, 'other': 1})
+
+    def test_top_tags_is_a_single_query_and_rebuild_matches(self):
+        from .tags import top_tags
+
+        for i in range(5):
+            post = Post.objects.create(title=f'P{i}', content='Body', author=self.author)
+            post.tags.add(*[f't{j}' for j in range(i + 1)])
+        with self.assertNumQueries(1):
+            ranked = top_tags(3)
+        self.assertEqual([(tag.name, count) for tag, count in ranked], [('t0', 5), ('t1', 4), ('t2', 3)])
+
+        before = self.counts()
+        call_command('rebuild_tag_counts', stdout=StringIO())
+        self.assertEqual(self.counts(), before)
+
+    def test_sidebar_lists_popular_tags(self):
+        post = Post.objects.create(title='Sidebar', content='Body', author=self.author)
+        post.tags.add('shown')
+        response = self.client.get(reverse('blog-home'))
+        self.assertContains(response, '#shown (1)')
+
+
+class TagPrefetchTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='prefetch', password='pass12345')
+        for i in range(8):
+            post = Post.objects.create(title=f'Tagged {i}', content='prefetching', author=author)
+            post.tags.add('shared', f'own{i}')
+
+    def test_prefetch_tags_loads_a_list_in_one_query(self):
+        from .models import prefetch_tags
+
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            prefetch_tags(posts)
+            names = [sorted(tag.name for tag in post.tags.all()) for post in posts]
+        self.assertEqual(names[0], ['own0', 'shared'])
+
+        # Already loaded: nothing left to fetch
+        with self.assertNumQueries(0):
+            prefetch_tags(posts)
+
+    def test_with_tags_queryset(self):
+        with self.assertNumQueries(2):
+            tags = [list(post.tags.all()) for post in Post.objects.with_tags()]
+        self.assertEqual(len(tags), 8)
+
+    def test_search_results_render_tags_without_per_post_queries(self):
+        self.client.get(reverse('post-search'), {'q': 'prefetching'})
+        # Count is cached now: ids, posts + authors, tags
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('post-search'), {'q': 'prefetching'})
+        self.assertContains(response, '#shared', count=8)
+
+
+class AsyncViewTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='asyncauthor', password='pass12345')
+        cls.posts = []
+        for i in range(7):
+            post = Post.objects.create(title=f'Async {i}', content='awaitable body', author=cls.author)
+            post.tags.add('asyncio', f'async{i}')
+            cls.posts.append(post)
+        Comment.objects.create(post=cls.posts[0], author=cls.author, content='First!')
+
+    async def test_feed_matches_sync_view(self):
+        response = await self.async_client.get(reverse('async-blog-home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [post.pk for post in response.context['posts']],
+            [post.pk for post in reversed(self.posts)][:5],
+        )
+        self.assertContains(response, '>#asyncio</a>', count=5)
+        self.assertContains(response, '#asyncio (7)')
+
+        # Cursor links lead to the rest of the feed
+        second = await self.async_client.get(
+            reverse('async-blog-home'), {'cursor': response.context['next_cursor']}
+        )
+        self.assertEqual(len(second.context['posts']), 2)
+        self.assertIsNone(second.context['next_cursor'])
+
+    async def test_tag_feed(self):
+        response = await self.async_client.get(
+            reverse('async-posts-by-tag', kwargs={'tag_slug': 'async3'})
+        )
+        self.assertEqual([post.title for post in response.context['posts']], ['Async 3'])
+        self.assertEqual(response.context['title'], 'Posts Tagged: async3')
+
+    async def test_detail_renders_tags_and_comments(self):
+        post = self.posts[0]
+        response = await self.async_client.get(reverse('async-post-detail', kwargs={'pk': post.pk}))
+        self.assertContains(response, 'First!')
+        self.assertContains(response, '#async0')
+        self.assertContains(response, 'log in</a> to leave a comment')
+
+        missing = await self.async_client.get(reverse('async-post-detail', kwargs={'pk': 9999}))
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_detail_for_signed_in_author(self):
+        await self.async_client.aforce_login(self.author)
+        post = self.posts[0]
+        response = await self.async_client.get(reverse('async-post-detail', kwargs={'pk': post.pk}))
+        self.assertContains(response, reverse('post-update', kwargs={'pk': post.pk}))
+        self.assertNotIn('X-Blog-Cache', response)
+
+    async def test_search(self):
+        response = await self.async_client.get(reverse('async-post-search'), {'q': 'awaitable'})
+        self.assertEqual(response.context['total'], 7)
+        self.assertTrue(response.context['has_next'] is False)
+        self.assertEqual(len(response.context['posts']), 7)
+
+    async def test_shares_the_page_cache_with_sync_views(self):
+        url = reverse('async-post-detail', kwargs={'pk': self.posts[1].pk})
+        first = await self.async_client.get(url)
+        self.assertEqual(first['X-Blog-Cache'], 'miss')
+        second = await self.async_client.get(url)
+        self.assertEqual(second['X-Blog-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+
+
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+    # Requests run on worker threads with their own connections, so the
+    # seeded rows have to be committed for them to see.
+
+    def setUp(self):
+        cache.clear()
+        call_command('seed_blog', users=3, posts=10, tags=4, seed=3, stdout=StringIO())
+
+    def test_reports_every_mode(self):
+        out = StringIO()
+        call_command('benchmark_concurrency', requests=8, concurrency=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        for line in lines[1:]:
+            # No failed requests in any mode
+            self.assertTrue(line.rstrip().endswith(' 0'), line)
+
+
+class ProductionDatabaseProfileTests(SimpleTestCase):
+    """The production profile on a scratch SQLite file (the test DB is in memory)."""
+
+    def setUp(self):
+        from django_blog.database import production_profile
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.settings_dict = production_profile(
+            {**connection.settings_dict, 'NAME': f'{directory}/blog.sqlite3'}
+        )
+        setup = self.connect()
+        self.addCleanup(setup.close)
+        with setup.cursor() as cursor:
+            cursor.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT, comment_count INT)')
+            cursor.execute('CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INT, content TEXT)')
+            cursor.executemany(
+                'INSERT INTO post (title, comment_count) VALUES (%s, 0)', [(f'Post {i}',) for i in range(200)]
+            )
+
+    def connect(self):
+        return DatabaseWrapper(dict(self.settings_dict), alias='production-profile')
+
+    def test_connections_are_persistent_and_tuned(self):
+        self.assertEqual(self.settings_dict['CONN_MAX_AGE'], 600)
+        self.assertTrue(self.settings_dict['CONN_HEALTH_CHECKS'])
+        reader = self.connect()
+        self.addCleanup(reader.close)
+        with reader.cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'mmap_size', 'busy_timeout')
+            }
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal', 'synchronous': 1, 'mmap_size': 256 * 1024 * 1024, 'busy_timeout': 5000,
+        })
+
+    def measure_reads(self, with_writer, seconds=0.5, readers=3):
+        stop = threading.Event()
+        reads = [0] * readers
+        writes = [0]
+        errors = []
+
+        def read(index):
+            reader = self.connect()
+            try:
+                cursor = reader.cursor()
+                while not stop.is_set():
+                    cursor.execute('SELECT id, title, comment_count FROM post ORDER BY id DESC LIMIT 20')
+                    cursor.fetchall()
+                    reads[index] += 1
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                reader.close()
+
+        def write():
+            # The same work as add_comment_to_post: insert + counter bump in one transaction
+            writer = self.connect()
+            try:
+                cursor = writer.cursor()
+                while not stop.is_set():
+                    cursor.execute('BEGIN IMMEDIATE')
+                    cursor.execute("INSERT INTO comment (post_id, content) VALUES (1, 'Nice post')")
+                    cursor.execute('UPDATE post SET comment_count = comment_count + 1 WHERE id = 1')
+                    cursor.execute('COMMIT')
+                    writes[0] += 1
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                writer.close()
+
+        threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+        if with_writer:
+            threads.append(threading.Thread(target=write))
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return sum(reads), writes[0]
+
+    def test_reads_keep_up_while_comments_are_written(self):
+        idle_reads, _ = self.measure_reads(with_writer=False)
+        busy_reads, writes = self.measure_reads(with_writer=True)
+        self.assertGreater(writes, 0)
+        # Readers share the CPU with the writer but never wait on its locks
+        self.assertGreater(busy_reads, idle_reads * 0.5, (idle_reads, busy_reads))
+
+
+@override_settings(BLOG_READ_REPLICAS=['replica'], BLOG_REPLICA_PIN_SECONDS=60)
+class ReadReplicaRouterTests(BlogTestCase):
+    """
+    Routing against a second SQLite database standing in for a replica. The
+    two databases hold different posts, so each page shows where it read from.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # The replica's test database exists only while these tests run, so the
+        # test runner, which sets up the databases listed up front, never sees it
+        cls.databases = {'default', 'replica'}
+        replica = {**settings.DATABASES['default'], 'TEST': {}}
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', 'Overriding setting DATABASES')
+            cls.addClassCleanup(cls.reload_databases)
+            cls.enterClassContext(override_settings(DATABASES={**settings.DATABASES, 'replica': replica}))
+        cls.reload_databases()
+        connections['replica'].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        cls.addClassCleanup(cls.drop_replica)
+        super().setUpClass()
+
+    @staticmethod
+    def reload_databases():
+        """Point ``connections`` at the current DATABASES setting (override_settings doesn't)."""
+        connections.__dict__.pop('settings', None)
+        connections._settings = None
+
+    @staticmethod
+    def drop_replica():
+        connections['replica'].creation.destroy_test_db(verbosity=0)
+        del connections['replica']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer', password='pass12345')
+        cls.primary_post = Post.objects.create(title='Only on the primary', content='fresh', author=cls.author)
+
+        replica_author = User.objects.db_manager('replica').create_user(username='writer', password='x')
+        cls.replica_post_pk = cls.primary_post.pk + 100
+        # bulk_create skips the signal handlers, which write to the primary
+        Post.objects.using('replica').bulk_create([
+            Post(pk=cls.replica_post_pk, title='Only on the replica', content='stale',
+                 author_id=replica_author.pk),
+        ])
+
+    def titles(self, response):
+        return [post.title for post in response.context['posts']]
+
+    def test_read_views_use_the_replica(self):
+        self.assertEqual(self.titles(self.client.get(reverse('blog-home'))), ['Only on the replica'])
+        detail = self.client.get(reverse('post-detail', kwargs={'pk': self.replica_post_pk}))
+        self.assertEqual(detail.status_code, 200)
+        missing = self.client.get(reverse('post-detail', kwargs={'pk': self.primary_post.pk}))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_search_reads_the_replica_index(self):
+        with connections['replica'].cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO blog_post_fts (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+                [self.replica_post_pk, 'Only on the replica', 'stale', ''],
+            )
+        response = self.client.get(reverse('post-search'), {'q': 'replica'})
+        self.assertEqual(self.titles(response), ['Only on the replica'])
+        self.assertEqual(response.context['total'], 1)
+
+    def test_writes_go_to_the_primary_and_pin_the_session(self):
+        self.client.force_login(self.author)
+        self.client.post(reverse('add-comment', kwargs={'pk': self.primary_post.pk}), {'content': 'Mine'})
+        self.assertEqual(Comment.objects.using('default').count(), 1)
+        self.assertEqual(Comment.objects.using('replica').count(), 0)
+
+        # The author now reads their own writes from the primary...
+        response = self.client.get(reverse('post-detail', kwargs={'pk': self.primary_post.pk}))
+        self.assertContains(response, 'Mine')
+        # ...while other readers stay on the replica
+        other = self.client_class()
+        self.assertEqual(self.titles(other.get(reverse('blog-home'))), ['Only on the replica'])
+
+    @override_settings(BLOG_REPLICA_PIN_SECONDS=0)
+    def test_pin_expires(self):
+        self.client.force_login(self.author)
+        self.client.post(reverse('add-comment', kwargs={'pk': self.primary_post.pk}), {'content': 'Mine'})
+        self.assertEqual(self.titles(self.client.get(reverse('blog-home'))), ['Only on the replica'])
+
+    def test_unmarked_views_read_the_primary(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('post-update', kwargs={'pk': self.primary_post.pk}))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(BLOG_READ_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        self.assertEqual(self.titles(self.client.get(reverse('blog-home'))), ['Only on the primary'])
+
+    def test_export_reads_the_given_database(self):
+        from .export import export_posts
+        data = b''.join(export_posts('ndjson', using='replica')).decode()
+        self.assertEqual([json.loads(line)['title'] for line in data.splitlines()], ['Only on the replica'])
+
+    async def test_async_views_use_the_replica(self):
+        response = await self.async_client.get(reverse('async-blog-home'))
+        self.assertEqual(self.titles(response), ['Only on the replica'])
+
+    def test_middleware_drops_out_without_replicas(self):
+        from django.core.exceptions import MiddlewareNotUsed
+        from .routers import ReplicaRoutingMiddleware
+
+        with override_settings(BLOG_READ_REPLICAS=[]), self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(lambda request: None)
+
+
+class TemplateWarmingTests(BlogTestCase):
+
+    def test_warmed_templates_render_without_loading(self):
+        from django.template.loaders.filesystem import Loader
+        from .template_cache import warm_templates
+
+        timings, errors = warm_templates()
+        self.assertEqual(errors, {})
+        self.assertIn('blog/home.html', timings)
+        self.assertIn('blog/comment_list.html', timings)
+
+        with mock.patch.object(Loader, 'get_contents', side_effect=AssertionError('template read from disk')):
+            response = self.client.get(reverse('blog-home'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_command_reports_syntax_errors(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        Path(directory, 'broken.html').write_text('{% if %}')
+        templates = [{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [directory],
+            'APP_DIRS': True,
+        }]
+        with override_settings(TEMPLATES=templates):
+            with self.assertRaisesMessage(CommandError, 'broken.html'):
+                call_command('warm_templates', stdout=StringIO())
+
+        out = StringIO()
+        call_command('warm_templates', stdout=out)
+        self.assertRegex(out.getvalue(), r'Compiled \d+ templates')
+
+
+
+class PostExportTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='exporter', password='pass12345')
+        cls.staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+        cls.posts = [
+            Post.objects.create(title=f'Post {i}', content=f'Body {i}', author=cls.author) for i in range(5)
+        ]
+        cls.posts[0].tags.add('django', 'export')
+        cls.posts[3].tags.add('django')
+        # Everything CSV and JSON have to escape
+        cls.posts[4].title = 'Quotes "and", commas'
+        cls.posts[4].content = 'Line one\nline "two"\r\nnaïve'
+        cls.posts[4].save()
+
+    def read(self, export_format, compress=False, chunk_size=2):
+        from .export import export_posts
+        data = b''.join(export_posts(export_format, chunk_size, compress))
+        if compress:
+            data = gzip.decompress(data)
+        return data.decode()
+
+    def test_ndjson(self):
+        records = [json.loads(line) for line in self.read('ndjson').splitlines()]
+        self.assertEqual([record['id'] for record in records], [post.pk for post in self.posts])
+        self.assertEqual(records[0]['tags'], ['django', 'export'])
+        self.assertEqual(records[1]['tags'], [])
+        self.assertEqual(records[3]['tags'], ['django'])
+        self.assertEqual(records[4]['title'], 'Quotes "and", commas')
+        self.assertEqual(records[4]['content'], 'Line one\nline "two"\r\nnaïve')
+        self.assertEqual(records[4]['author'], 'exporter')
+        self.assertEqual(records[4]['comment_count'], 0)
+        self.assertTrue(records[4]['published_date'].startswith(str(self.posts[4].published_date.year)))
+
+    def test_csv(self):
+        rows = list(csv.reader(StringIO(self.read('csv', compress=True), newline='')))
+        self.assertEqual(rows[0], ['id', 'title', 'content', 'author', 'published_date', 'updated_at',
+                                   'comment_count', 'tags'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][0], str(self.posts[0].pk))
+        self.assertEqual(rows[1][7], 'django,export')
+        self.assertEqual(rows[2][7], '')
+        self.assertEqual(rows[5][1:4], ['Quotes "and", commas', 'Line one\nline "two"\r\nnaïve', 'exporter'])
+
+    def test_dates_match_the_change_feed(self):
+        # One date with a fraction, one without
+        Post.objects.filter(pk=self.posts[1].pk).update(
+            published_date=datetime(2024, 5, 6, 7, 8, 9, 123456, tzinfo=dt_timezone.utc),
+            updated_at=datetime(2024, 5, 6, 7, 8, 9, tzinfo=dt_timezone.utc),
+        )
+        self.client.force_login(self.staff)
+        feed = {
+            change['id']: change['post']
+            for change in self.client.get(reverse('post-changes'), {'limit': 100}).json()['changes']
+        }
+        records = [json.loads(line) for line in self.read('ndjson').splitlines()]
+        rows = list(csv.DictReader(StringIO(self.read('csv'), newline='')))
+        self.assertEqual(records[1]['published_date'], '2024-05-06T07:08:09.123Z')
+        self.assertEqual(records[1]['updated_at'], '2024-05-06T07:08:09Z')
+        for record, row in zip(records, rows):
+            for name in ('published_date', 'updated_at'):
+                self.assertEqual(record[name], feed[record['id']][name])
+                self.assertEqual(row[name], record[name])
+
+    def test_empty_csv_has_header(self):
+        Post.objects.all().delete()
+        self.assertEqual(self.read('csv'), 'id,title,content,author,published_date,updated_at,comment_count,tags\r\n')
+        self.assertEqual(self.read('ndjson'), '')
+
+    def test_endpoint(self):
+        url = reverse('post-export')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+
+        response = self.client.get(url, {'format': 'csv', 'gzip': '1'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(body.count('\r\n'), 7)  # header, 5 rows, one line break inside a value
+
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 5)
+
+    def test_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = Path(directory, 'posts.ndjson')
+        err = StringIO()
+        call_command('export_posts', output=str(path), stderr=err)
+        self.assertEqual(len(path.read_text().splitlines()), 5)
+        self.assertIn('Exported 5 posts', err.getvalue())
+
+
+class ChangeFeedTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='syncer', password='pass12345')
+        cls.staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+        cls.posts = [
+            Post.objects.create(title=f'Post {i}', content='Body', author=cls.author) for i in range(3)
+        ]
+        cls.posts[0].tags.add('sync')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+
+    def sync(self, since=0, **params):
+        response = self.client.get(reverse('post-changes'), {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_then_incremental_sync(self):
+        page = self.sync()
+        # In order of each post's last change: tagging the first one came last
+        self.assertEqual(
+            [change['id'] for change in page['changes']], [post.pk for post in self.posts[1:] + self.posts[:1]]
+        )
+        self.assertFalse(page['has_more'])
+        first = page['changes'][-1]['post']
+        self.assertEqual(first['title'], 'Post 0')
+        self.assertEqual(first['author'], 'syncer')
+        self.assertEqual(first['tags'], ['sync'])
+        since = page['since']
+
+        self.assertEqual(self.sync(since), {'changes': [], 'since': since, 'has_more': False})
+
+        post = self.posts[1]
+        post.title = 'Renamed'
+        post.save()
+        post.tags.add('edited')
+        Comment.objects.create(post=post, author=self.author, content='Hi')
+        deleted_id = self.posts[2].pk
+        self.posts[2].delete()
+        created = Post.objects.create(title='New', content='Body', author=self.author)
+
+        page = self.sync(since)
+        changes = {change['id']: change for change in page['changes']}
+        # One entry per post however many times it changed
+        self.assertEqual(len(page['changes']), 3)
+        self.assertEqual(changes[post.pk]['post']['title'], 'Renamed')
+        self.assertEqual(changes[post.pk]['post']['tags'], ['edited'])
+        self.assertEqual(changes[post.pk]['post']['comment_count'], 0)
+        self.assertTrue(changes[deleted_id]['deleted'])
+        self.assertFalse(changes[created.pk]['deleted'])
+        self.assertEqual(self.sync(page['since'])['changes'], [])
+
+    def test_tombstones(self):
+        post_id = self.posts[2].pk
+        since = self.sync()['since']
+        self.posts[2].delete()
+        change, = self.sync(since)['changes']
+        self.assertEqual(change, {'token': change['token'], 'id': post_id, 'deleted': True, 'post': None})
+
+    def test_paging(self):
+        page = self.sync(limit=2)
+        self.assertEqual(len(page['changes']), 2)
+        self.assertTrue(page['has_more'])
+        page = self.sync(page['since'], limit=2)
+        self.assertEqual([change['id'] for change in page['changes']], [self.posts[0].pk])
+        self.assertFalse(page['has_more'])
+
+    def test_bulk_rebuild_logs_corrected_posts_only(self):
+        since = self.sync()['since']
+        Post.objects.filter(pk=self.posts[1].pk).update(comment_count=4)
+        call_command('rebuild_comment_counts', stdout=StringIO())
+        change, = self.sync(since)['changes']
+        self.assertEqual(change['id'], self.posts[1].pk)
+        self.assertEqual(change['post']['comment_count'], 0)
+
+    def test_staff_only_and_bad_tokens(self):
+        self.assertEqual(self.client.get(reverse('post-changes'), {'since': 'abc'}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('post-changes')).status_code, 302)
+
+
+class SessionProfileTests(BlogTestCase):
+
+    def store(self, engine='cached_db'):
+        from importlib import import_module
+        return import_module(f'blog.sessions.{engine}').SessionStore
+
+    def session_writes(self, captured):
+        return [query['sql'] for query in captured if 'django_session' in query['sql']
+                and not query['sql'].startswith('SELECT')]
+
+    def test_unchanged_sessions_are_not_saved(self):
+        SessionStore = self.store()
+        session = SessionStore()
+        session['theme'] = 'dark'
+        session.create()
+
+        session = SessionStore(session.session_key)
+        session['theme'] = 'dark'  # Marks the session modified, same data
+        with CaptureQueriesContext(connection) as captured:
+            session.save()
+        # Loaded from the cache and not written back: no queries at all
+        self.assertEqual(captured.captured_queries, [])
+
+        session['theme'] = 'light'
+        with CaptureQueriesContext(connection) as captured:
+            session.save()
+        self.assertTrue(self.session_writes(captured))
+        self.assertEqual(SessionStore(session.session_key)['theme'], 'light')
+
+    @override_settings(SESSION_SAVE_EVERY_REQUEST=True, BLOG_SESSION_REFRESH_INTERVAL=300)
+    def test_sliding_expiry_refreshes_are_throttled(self):
+        SessionStore = self.store('cache')
+        session = SessionStore()
+        session['theme'] = 'dark'
+        session.create()
+        session = SessionStore(session.session_key)
+        session.load()
+        from django.contrib.sessions.backends import cache as cache_sessions
+        with mock.patch.object(cache_sessions.SessionStore, 'save') as save:
+            session.save()
+            save.assert_not_called()
+            with override_settings(BLOG_SESSION_REFRESH_INTERVAL=0):
+                session.save()
+            save.assert_called_once()
+
+    @override_settings(SESSION_ENGINE='blog.sessions.cached_db', SESSION_SAVE_EVERY_REQUEST=True)
+    def test_browsing_writes_no_sessions(self):
+        user = User.objects.create_user(username='reader', password='pass12345')
+        Post.objects.create(title='Post', content='Body', author=user)
+        self.client.force_login(user)
+        self.client.get(reverse('blog-home'))
+        with CaptureQueriesContext(connection) as captured:
+            for _ in range(3):
+                self.assertEqual(self.client.get(reverse('blog-home')).status_code, 200)
+        self.assertFalse([query for query in captured if 'django_session' in query['sql']])
+
+    def test_load_test_command(self):
+        call_command('seed_blog', users=3, posts=10, tags=3, seed=3, stdout=StringIO())
+        out = StringIO()
+        call_command('benchmark_sessions', users=2, requests=6, stdout=out)
+        rows = {tuple(line.split()[:2]): line.split()[2:] for line in out.getvalue().splitlines()[1:-1]}
+        # reads, writes, db writes per request
+        self.assertEqual(rows['db', 'sliding'][1:], ['1.00', '1.00', '1.00'])
+        self.assertEqual(rows['cached_db', 'sliding'][1:], ['0.00', '0.00', '0.00'])
+        self.assertEqual(rows['cache', 'fixed'][1:], ['0.00', '0.00', '0.00'])
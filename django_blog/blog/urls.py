@@ -1,9 +1,9 @@
+# blog/urls.py
 
-# blog/urls.py (UPDATED)
-
+from django.conf import settings
 from django.urls import path
-from . import views
-from .views import ( # <-- IMPORT THE CBVs
+from . import async_views, views
+from .views import (
     PostListView,
     PostDetailView,
     PostCreateView,
@@ -11,57 +11,68 @@ from .views import ( # <-- IMPORT THE CBVs
     PostDeleteView
 )
 
+# Read-only views for the canonical URLs; async deployments can swap in the
+# native async implementations (always available under async/ as well).
+if getattr(settings, 'BLOG_ASYNC_VIEWS', False):
+    post_list = async_views.post_list
+    post_detail = async_views.post_detail
+    post_search = async_views.post_search
+else:
+    post_list = PostListView.as_view()
+    post_detail = PostDetailView.as_view()
+    post_search = views.post_search
+
 urlpatterns = [
     # Blog Homepage (uses PostListView)
-    path('', PostListView.as_view(), name='blog-home'),
-    
+    path('', post_list, name='blog-home'),
+
     # R - READ (Detail)
-    path('post/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
-    
+    path('post/<int:pk>/', post_detail, name='post-detail'),
+
     # C - CREATE
     path('post/new/', PostCreateView.as_view(), name='post-create'),
-    
+
     # U - UPDATE
     path('post/<int:pk>/update/', PostUpdateView.as_view(), name='post-update'),
-    
+
     # D - DELETE
     path('post/<int:pk>/delete/', PostDeleteView.as_view(), name='post-delete'),
-    
-    # Custom Authentication URLs (Keep these)
-    path('register/', views.register, name='register'),
-    path('profile/', views.profile, name='profile'),
-]
-# blog/urls.py (UPDATED with Comment URLs)
-
-# ... existing imports ...
-
-urlpatterns = [
-    # ... existing Post and Auth URLs ...
 
     # Comment URLs
+    # R - READ Comments (HTML fragment with the next page of comments)
+    path('post/<int:pk>/comments/', views.post_comments, name='post-comments'),
+
     # C - CREATE Comment (Uses function-based view for simplicity)
     path('post/<int:pk>/comment/new/', views.add_comment_to_post, name='add-comment'),
-    
+
     # U - UPDATE Comment (Note: uses <int:pk> for the Comment ID, not the Post ID)
     path('comment/<int:pk>/update/', views.CommentUpdateView.as_view(), name='comment-update'),
-    
+
     # D - DELETE Comment
     path('comment/<int:pk>/delete/', views.CommentDeleteView.as_view(), name='comment-delete'),
-    
-    # ... existing register/profile URLs ...
-]
-# blog/urls.py (UPDATED)
 
-# ... existing imports ...
-
-urlpatterns = [
-    # ... existing Post and Auth URLs ...
-    
     # SEARCH URL
-    path('search/', views.post_search, name='post-search'), # <-- ADD THIS
-    
+    path('search/', post_search, name='post-search'),
+
     # TAG URL (Shows posts with a specific tag)
-    path('tags/<slug:tag_slug>/', views.PostListView.as_view(), name='posts-by-tag'), # <-- ADD THIS
+    path('tags/<slug:tag_slug>/', post_list, name='posts-by-tag'),
 
-    # ... existing register/profile URLs ...
+    # Native async read views
+    path('async/', async_views.post_list, name='async-blog-home'),
+    path('async/post/<int:pk>/', async_views.post_detail, name='async-post-detail'),
+    path('async/search/', async_views.post_search, name='async-post-search'),
+    path('async/tags/<slug:tag_slug>/', async_views.post_list, name='async-posts-by-tag'),
+
+    # Streaming NDJSON/CSV dump of every post (staff only)
+    path('export/posts/', views.post_export, name='post-export'),
+
+    # Incremental sync: posts changed since a token, with tombstones (staff only)
+    path('changes/posts/', views.post_changes, name='post-changes'),
+
+    # Per-URL timings collected by ProfilingMiddleware (staff only)
+    path('profiling/', views.profiling_summary, name='profiling-summary'),
+
+    # Custom Authentication URLs
+    path('register/', views.register, name='register'),
+    path('profile/', views.profile, name='profile'),
 ]
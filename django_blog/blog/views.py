@@ -1,60 +1,192 @@
 # blog/views.py
 
-from django.views.generic import ListView
-from .models import Post
-
-# Use Django's built-in ListView to fetch and display multiple object
-# blog/views.py
-
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin # <-- NEW IMPORTS
-from django.views.generic import ( # <-- UPDATED IMPORTS
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.views.generic import (
     ListView,
     DetailView,
     CreateView,
     UpdateView,
     DeleteView
 )
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.forms import UserChangeForm # Still needed for profile view
-from .forms import UserRegisterForm
-from .models import Post, User 
-
-# --- Authentication Views (Keep these as they were) ---
-# ... register(request) function ...
-# ... profile(request) function ...
-# ------------------------------------------------------
+from django.db import router, transaction
+from django.db.models import F
+from django.http import HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from .caching import CachedPageMixin, ConditionalGetMixin, rows_etag
+from .changes import CHANGES_MAX_PAGE_SIZE, CHANGES_PAGE_SIZE, changes_since
+from .export import CONTENT_TYPES, EXPORT_FORMATS, export_posts
+from .forms import UserRegisterForm, CommentForm
+from .models import Post, Comment
+from .pagination import CursorPaginator
+from .profiling import profile_summary
+from .routers import read_from_replica
+from .search import MATCH_COUNT_CAP, count_matches, search_posts
+from .tags import TAG_CLOUD_SCOPE, popular_tags
+
+COMMENTS_PER_PAGE = 20
+POPULAR_TAGS_LIMIT = 15
+SEARCH_RESULTS_PER_PAGE = 10
+# Deeper pages are not served: ranked results past this point are noise.
+# They end where the counted total does, so every counted match is reachable.
+SEARCH_MAX_PAGES = MATCH_COUNT_CAP // SEARCH_RESULTS_PER_PAGE
 
 
 # --- Blog Post Views (CRUD) ---
 
-class PostListView(ListView):
+class PostListView(CachedPageMixin, ConditionalGetMixin, ListView):
     # R - READ (List)
     model = Post
-    template_name = 'blog/home.html'  # Use the existing home template
+    template_name = 'blog/home.html'
     context_object_name = 'posts'
     ordering = ['-published_date']
-    paginate_by = 5 # Optional: Add pagination
+    paginate_by = 5
+    cache_name = 'post-list'
+    read_from_replica = True
+
+    def get_cache_scopes(self):
+        tag_slug = self.kwargs.get('tag_slug')
+        # The sidebar's tag cloud changes with posts that are not on this page
+        return [f'tag:{tag_slug}' if tag_slug else 'feed', TAG_CLOUD_SCOPE]
+
+    def get_base_queryset(self):
+        # Check if a tag slug is present in the URL
+        tag_slug = self.kwargs.get('tag_slug')
+        if tag_slug:
+            # Filter posts by the given tag name
+            return Post.objects.filter(tags__slug=tag_slug).order_by('-published_date')
+
+        # If no tag is provided, return all posts (default behavior)
+        return super().get_queryset()
+
+    def get_queryset(self):
+        # Authors and tags are loaded up front so rendering the page never
+        # issues a query per post.
+        return self.get_base_queryset().for_listing()
+
+    def get_etag(self):
+        # Validator from the (id, updated_at) of the posts on the requested
+        # page: one narrow query, no prefetching or rendering.
+        queryset = self.get_base_queryset().only('pk', 'published_date', 'updated_at')
+        if self.get_pagination_mode() == 'cursor':
+            rows = CursorPaginator(queryset, self.paginate_by).page(self.request.GET.get('cursor'))
+        else:
+            # Slice directly rather than through the paginator to skip its COUNT(*)
+            try:
+                page_number = int(self.request.GET.get('page') or 1)
+            except ValueError:
+                return None
+            if page_number < 1:
+                return None
+            offset = (page_number - 1) * self.paginate_by
+            rows = list(queryset[offset:offset + self.paginate_by])
+        return rows_etag(self.request, rows, [TAG_CLOUD_SCOPE])
+
+    def get_pagination_mode(self):
+        # 'offset' keeps Django's numbered pages; 'cursor' switches to keyset pagination
+        return getattr(settings, 'BLOG_FEED_PAGINATION', 'offset')
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.get_pagination_mode() != 'cursor':
+            return super().paginate_queryset(queryset, page_size)
+
+        page = CursorPaginator(queryset, page_size).page(self.request.GET.get('cursor'))
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        # Optionally add the current tag name to the context for the template title
+        context = super().get_context_data(**kwargs)
+        tag_slug = self.kwargs.get('tag_slug')
+        if tag_slug:
+            context['title'] = f"Posts Tagged: {tag_slug}"
+        context['popular_tags'] = popular_tags(POPULAR_TAGS_LIMIT)
+        page = context.get('page_obj')
+        context['next_cursor'] = getattr(page, 'next_cursor', None)
+        context['prev_cursor'] = getattr(page, 'previous_cursor', None)
+        return context
+
 
-class PostDetailView(DetailView):
+def get_comment_page(post_id, cursor=None):
+    # One keyset page of a post's comments, oldest first, authors joined in
+    comments = Comment.objects.filter(post_id=post_id).select_related('author')
+    paginator = CursorPaginator(comments, COMMENTS_PER_PAGE, field='created_at', descending=False)
+    return paginator.page(cursor)
+
+
+class PostDetailView(CachedPageMixin, ConditionalGetMixin, DetailView):
     # R - READ (Detail)
     model = Post
     template_name = 'blog/post_detail.html'
     context_object_name = 'post'
+    cache_name = 'post-detail'
+    read_from_replica = True
+
+    def get_cache_scopes(self):
+        return [f"post:{self.kwargs['pk']}"]
+
+    def get_updated_at(self):
+        if not hasattr(self, '_updated_at'):
+            self._updated_at = (
+                Post.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True).first()
+            )
+        return self._updated_at
+
+    def get_etag(self):
+        updated_at = self.get_updated_at()
+        if updated_at is None:
+            return None
+        return rows_etag(self.request, [Post(pk=self.kwargs['pk'], updated_at=updated_at)])
+
+    def get_last_modified(self):
+        # Last-Modified can't vary per user, so only anonymous pages carry it
+        if self.request.user.is_authenticated:
+            return None
+        return self.get_updated_at()
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('author').with_tags()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Add the CommentForm to the context for use in the template
+        context['form'] = CommentForm()
+        # Only the first page of comments is rendered; the rest load on demand
+        context['comments'] = get_comment_page(self.object.pk, self.request.GET.get('comments'))
+        return context
+
+
+@read_from_replica
+def post_comments(request, pk):
+    """Returns the next page of a post's comments as an HTML fragment."""
+    post = get_object_or_404(Post.objects.only('pk', 'author_id'), pk=pk)
+    context = {
+        'post': post,
+        'comments': get_comment_page(post.pk, request.GET.get('cursor')),
+    }
+    return render(request, 'blog/comment_list.html', context)
+
 
 class PostCreateView(LoginRequiredMixin, CreateView):
-    # ...
-    fields = ['title', 'content', 'tags'] # <-- ADD 'tags'
+    # C - CREATE
+    model = Post
+    template_name = 'blog/post_form.html'
+    fields = ['title', 'content', 'tags']
 
     def form_valid(self, form):
         # Automatically set the author to the logged-in user
         form.instance.author = self.request.user
         return super().form_valid(form)
 
+
 class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
-    # ...
-    fields = ['title', 'content', 'tags'] # <-- ADD 'tags'
+    # U - UPDATE
+    model = Post
+    template_name = 'blog/post_form.html'
+    fields = ['title', 'content', 'tags']
 
     def form_valid(self, form):
         # Automatically set the author to the logged-in user (though it shouldn't change)
@@ -66,6 +198,7 @@ class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         post = self.get_object()
         return self.request.user == post.author
 
+
 class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     # D - DELETE
     model = Post
@@ -77,6 +210,42 @@ class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         post = self.get_object()
         return self.request.user == post.author
 
+
+@read_from_replica
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page_number = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page_number = 1
+
+    page_number = min(page_number, SEARCH_MAX_PAGES)
+
+    # Ranked matches from the full-text index; only one page of rows is ever
+    # loaded, and one extra row tells us whether there is a next page.
+    posts = []
+    total = 0
+    if query:
+        offset = (page_number - 1) * SEARCH_RESULTS_PER_PAGE
+        posts = search_posts(query, SEARCH_RESULTS_PER_PAGE + 1, offset)
+        total = count_matches(query, MATCH_COUNT_CAP)
+    has_next = len(posts) > SEARCH_RESULTS_PER_PAGE and page_number < SEARCH_MAX_PAGES
+
+    context = {
+        'posts': posts[:SEARCH_RESULTS_PER_PAGE],
+        'query': query,
+        'total': min(total, MATCH_COUNT_CAP),
+        'total_capped': total > MATCH_COUNT_CAP,
+        'page_number': page_number,
+        'has_next': has_next,
+        'has_previous': page_number > 1,
+        'title': f'Search Results for "{query}"'
+    }
+    return render(request, 'blog/search_results.html', context)
+
+
+# --- Authentication Views ---
+
 def register(request):
     if request.method == 'POST':
         form = UserRegisterForm(request.POST)
@@ -104,15 +273,10 @@ def profile(request):
         form = UserChangeForm(instance=request.user)
 
     # We need to remove the password fields from the form for a proper UI
-    form.fields.pop('password') 
-    
-    return render(request, 'blog/profile.html', {'form': form, 'title': 'Profile'})
-# blog/views.py (ADDITIONS)
+    form.fields.pop('password')
 
-from .forms import UserRegisterForm, CommentForm # <-- UPDATED IMPORT
-from .models import Post, User, Comment         # <-- UPDATED IMPORT
+    return render(request, 'blog/profile.html', {'form': form, 'title': 'Profile'})
 
-# ... (Keep existing Post, register, and profile views) ...
 
 # ------------------------------------------------------------------
 # Comment Views (CRUD)
@@ -122,19 +286,19 @@ from .models import Post, User, Comment         # <-- UPDATED IMPORT
 def add_comment_to_post(request, pk):
     """Handles adding a new comment directly from the post detail page."""
     post = get_object_or_404(Post, pk=pk)
-    
+
     if request.method == "POST":
         form = CommentForm(request.POST)
         if form.is_valid():
             comment = form.save(commit=False)
             comment.post = post
             comment.author = request.user
-            comment.save()
+            with transaction.atomic():
+                comment.save()
+                Post.objects.filter(pk=post.pk).update(comment_count=F('comment_count') + 1)
             messages.success(request, 'Your comment was posted successfully!')
-            return redirect('post-detail', pk=post.pk)
-    else:
-        # If accessing via GET, the form will be displayed on the detail page
-        return redirect('post-detail', pk=post.pk)
+    # If accessing via GET, the form will be displayed on the detail page
+    return redirect('post-detail', pk=post.pk)
 
 
 class CommentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
@@ -142,10 +306,10 @@ class CommentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     model = Comment
     form_class = CommentForm
     template_name = 'blog/comment_form.html'
-    
+
     # We don't need to specify success_url here because the model's get_absolute_url
     # method will redirect to the post detail page automatically.
-    
+
     def test_func(self):
         # Only the author can update the comment
         comment = self.get_object()
@@ -156,85 +320,75 @@ class CommentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     # D - DELETE Comment
     model = Comment
     template_name = 'blog/comment_confirm_delete.html'
-    
+
     def get_success_url(self):
         # Redirect to the post detail page after deletion
-        return reverse('post-detail', kwargs={'pk': self.object.post.pk})
+        return reverse('post-detail', kwargs={'pk': self.object.post_id})
+
+    def form_valid(self, form):
+        # Delete the comment and decrement the post's counter together
+        success_url = self.get_success_url()
+        with transaction.atomic():
+            _, deleted = self.object.delete()
+            # A concurrent request may have deleted it first; count it only once
+            if deleted.get(Comment._meta.label):
+                Post.objects.filter(pk=self.object.post_id).update(comment_count=F('comment_count') - 1)
+        return HttpResponseRedirect(success_url)
 
     def test_func(self):
         # Only the author can delete the comment
         comment = self.get_object()
         return self.request.user == comment.author
 
-# Ensure you keep your existing PostListView, DetailView, etc. below this
-# blog/views.py (UPDATED)
-
-# ... (Keep all imports) ...
-
-class PostDetailView(DetailView):
-    # R - READ (Detail)
-    model = Post
-    template_name = 'blog/post_detail.html'
-    context_object_name = 'post'
-
-    def get_context_data(self, **kwargs): # <-- ADD THIS METHOD
-        context = super().get_context_data(**kwargs)
-        # Add the CommentForm to the context for use in the template
-        context['form'] = CommentForm() 
-        return context
-# blog/views.py (ADDITIONS)
 
-from django.db.models import Q # <-- ADD THIS IMPORT
+# ------------------------------------------------------------------
+# Instrumentation
+# ------------------------------------------------------------------
 
-# ... (Keep existing PostListView, DetailView, etc.) ...
+@user_passes_test(lambda user: user.is_staff)
+def profiling_summary(request):
+    """Hot endpoints in this process, as collected by ProfilingMiddleware."""
+    return JsonResponse({'endpoints': profile_summary()})
 
-def post_search(request):
-    query = request.GET.get('q')
-    results = Post.objects.all()
-    
-    if query:
-        # 1. Filter by Title or Content (Q objects create OR logic)
-        results = results.filter(
-            Q(title__icontains=query) | Q(content__icontains=query)
-        )
-        
-        # 2. Filter by Tags (using taggit's manager method)
-        # Note: We use .union() to combine results from content/title search with tag search
-        tag_results = Post.objects.filter(tags__name__icontains=query)
-        
-        # Combine the results (using set union to avoid duplicates, then converting back)
-        results = (results | tag_results).distinct().order_by('-published_date')
 
-    context = {
-        'posts': results,
-        'query': query,
-        'title': f'Search Results for "{query}"'
-    }
-    return render(request, 'blog/search_results.html', context)
-# blog/views.py (PostListView UPDATED)
-
-class PostListView(ListView):
-    # R - READ (List)
-    model = Post
-    template_name = 'blog/home.html'
-    context_object_name = 'posts'
-    ordering = ['-published_date']
-    paginate_by = 5
+# ------------------------------------------------------------------
+# Export and sync
+# ------------------------------------------------------------------
 
-    def get_queryset(self):
-        # Check if a tag slug is present in the URL
-        tag_slug = self.kwargs.get('tag_slug')
-        if tag_slug:
-            # Filter posts by the given tag name
-            return Post.objects.filter(tags__slug=tag_slug).order_by('-published_date')
-        
-        # If no tag is provided, return all posts (default behavior)
-        return super().get_queryset()
-    
-    def get_context_data(self, **kwargs):
-        # Optionally add the current tag name to the context for the template title
-        context = super().get_context_data(**kwargs)
-        tag_slug = self.kwargs.get('tag_slug')
-        if tag_slug:
-            context['title'] = f"Posts Tagged: {tag_slug}"
-        return context
+@user_passes_test(lambda user: user.is_staff)
+@read_from_replica
+def post_export(request):
+    """Every post as NDJSON (default) or CSV (?format=csv), streamed; ?gzip=1 compresses it."""
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    compress = request.GET.get('gzip') in ('1', 'true')
+
+    # The body is read after this view returns, when requests are no longer
+    # routed: pick the database (a replica, if any) now
+    using = router.db_for_read(Post)
+    response = StreamingHttpResponse(
+        export_posts(export_format, compress=compress, using=using), content_type=CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="posts.{export_format}"'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
+
+@user_passes_test(lambda user: user.is_staff)
+@read_from_replica
+def post_changes(request):
+    """
+    Posts created, updated or deleted after ?since=<token> (0 or absent: all
+    of them), at most ?limit= per page. Each change carries the post or a
+    tombstone; the returned ``since`` is the token for the next call.
+    """
+    try:
+        since = max(int(request.GET.get('since', 0)), 0)
+        limit = min(max(int(request.GET.get('limit', CHANGES_PAGE_SIZE)), 1), CHANGES_MAX_PAGE_SIZE)
+    except ValueError:
+        return HttpResponseBadRequest('since and limit must be integers')
+
+    changes, since, has_more = changes_since(since, limit)
+    return JsonResponse({'changes': changes, 'since': since, 'has_more': has_more})
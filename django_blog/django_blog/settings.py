@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import production_profile
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,16 +45,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack (inactive unless BLOG_PROFILING)
+    'blog.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # After sessions: pins sessions that just wrote to the primary database
+    'blog.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'blog_project.urls'
+ROOT_URLCONF = 'django_blog.urls'
 
 TEMPLATES = [
     {
@@ -68,13 +75,27 @@ TEMPLATES = [
     },
 ]
 
-WSGI_APPLICATION = 'blog_project.wsgi.application'
+# BLOG_TEMPLATE_PROFILE=production compiles each template once per process
+# (never checking for changes on disk) and parses them all when a worker
+# starts (blog/template_cache.py), so no request pays for parsing.
+BLOG_TEMPLATE_PROFILE = os.environ.get('BLOG_TEMPLATE_PROFILE', 'development')
+BLOG_WARM_TEMPLATES = BLOG_TEMPLATE_PROFILE == 'production'
+if BLOG_TEMPLATE_PROFILE == 'production':
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+WSGI_APPLICATION = 'django_blog.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-# blog_project/settings.py
+# django_blog/settings.py
 
 
 
@@ -118,13 +139,36 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-# blog_project/settings.py
+# django_blog/settings.py
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+
+# Read replicas: the feeds, post pages and search read from these aliases
+# (see blog/routers.py). BLOG_REPLICA_DB=/path/to/copy.sqlite3 adds one.
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+BLOG_READ_REPLICAS = []
+# How long a session reads from the primary after writing (replication lag)
+BLOG_REPLICA_PIN_SECONDS = 5
+if os.environ.get('BLOG_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['BLOG_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    BLOG_READ_REPLICAS = ['replica']
+
+# BLOG_DB_PROFILE=production keeps connections open between requests and
+# puts SQLite in WAL mode (see django_blog/database.py)
+BLOG_DB_PROFILE = os.environ.get('BLOG_DB_PROFILE', 'development')
+if BLOG_DB_PROFILE == 'production':
+    for alias in DATABASES:
+        DATABASES[alias] = production_profile(
+            DATABASES[alias], conn_max_age=int(os.environ.get('BLOG_CONN_MAX_AGE', 600))
+        )
 # django_blog/settings.py (ADDITIONS)
 
 # Default URL to redirect to after a successful login (the profile page)
@@ -132,3 +176,47 @@ LOGIN_REDIRECT_URL = 'profile'
 
 # Default URL to redirect to if user tries to access a @login_required page
 LOGIN_URL = 'login'
+
+# Home and tag feeds use keyset (cursor) pagination: no COUNT(*), no OFFSET scans.
+# Set to 'offset' for classic numbered pages.
+BLOG_FEED_PAGINATION = 'cursor'
+
+# Caching
+# Rendered pages for anonymous readers are cached under per-post/per-tag
+# versions (see blog/caching.py). Any backend works; for a cache shared
+# between processes use e.g. 'django.core.cache.backends.filebased.FileBasedCache'.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'django-blog',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+BLOG_CACHE_ALIAS = 'default'
+BLOG_CACHE_TIMEOUT = 300
+
+# Sessions. BLOG_SESSION_PROFILE=cached_db reads them through the cache (the
+# database stays the durable copy) and BLOG_SESSION_PROFILE=cache keeps them
+# in the cache only; both skip saving unchanged sessions (blog/sessions/).
+# They get a cache of their own, so page caching can't evict logins; with
+# more than one process it must be a shared backend (e.g. Redis, Memcached).
+BLOG_SESSION_PROFILE = os.environ.get('BLOG_SESSION_PROFILE', 'db')
+if BLOG_SESSION_PROFILE in ('cache', 'cached_db'):
+    SESSION_ENGINE = f'blog.sessions.{BLOG_SESSION_PROFILE}'
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'django-blog-sessions',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+    SESSION_CACHE_ALIAS = 'sessions'
+# With SESSION_SAVE_EVERY_REQUEST, an unchanged session is re-saved to push
+# its expiry back at most this often (seconds)
+BLOG_SESSION_REFRESH_INTERVAL = 300
+
+# Request profiling: Server-Timing headers and per-URL aggregates (blog/profiling.py)
+BLOG_PROFILING = False
+BLOG_PROFILING_WINDOW = 500
+
+# Serve the feed, detail, search and tag pages with the native async views
+# (blog/async_views.py); worth enabling when running under an ASGI server.
+BLOG_ASYNC_VIEWS = False
@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_project.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_blog.settings')
 
 application = get_wsgi_application()
+
+# Parse every template now rather than on this worker's first requests
+from blog.template_cache import warm_templates_on_startup  # noqa: E402
+
+warm_templates_on_startup()